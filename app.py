@@ -9,18 +9,24 @@ Questa applicazione fornisce un'interfaccia web per:
 - Permettere agli utenti di scaricare i risultati.
 """
 
-from flask import Flask, render_template, request, send_file, redirect, url_for
+from flask import Flask, render_template, request, redirect, url_for, send_file
+import io
 import os
 import time
 import uuid
-import json
-from io import BytesIO
+import orjson
+import hashlib
+import numpy as np
 import folium # Per la generazione di mappe interattive
+from folium.plugins import FastMarkerCluster # Marcatori raggruppati e disegnati lato browser
 
 # Importa i moduli personalizzati dalla directory src
-from src.data_fetcher import NominatimFetcher
+from src.data_fetcher import NominatimFetcher, REGIONS, cities_to_arrays
 from src.distance_matrix import DistanceCalculator
 from src.NN_ILS import TSPSolver # Algoritmo di risoluzione TSP
+from src.session_store import SessionStore # Dati di sessione su disco con cache in memoria
+from src.lru_cache import LRUCache
+from src.NN_ILS_numba import warmup as warmup_solver_kernels
 
 app = Flask(__name__)
 # Rende 'enumerate' disponibile nei template Jinja2
@@ -28,10 +34,49 @@ app.jinja_env.globals['enumerate'] = enumerate
 # Imposta una chiave segreta per la gestione della sessione e altri scopi di sicurezza
 app.config['SECRET_KEY'] = uuid.uuid4().hex
 
+# Precompila i kernel Numba all'avvio, così la prima richiesta /solve_tsp non paga la
+# compilazione JIT. Con `python app.py` in debug il processo padre del reloader si limita
+# a sorvegliare i file: la precompilazione avviene solo nel processo figlio che serve le richieste.
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN'):
+    warmup_solver_kernels()
+
 # Assicura che la directory 'data' per la memorizzazione dei file di sessione e cache esista
 if not os.path.exists('data'):
     os.makedirs('data')
 
+# Fetcher condiviso da tutte le richieste e mappa costante delle regioni,
+# creati una sola volta all'avvio invece che a ogni richiesta
+_FETCHER = NominatimFetcher(user_agent="ItalianRegionsTSP-Web/1.0")
+_REGIONS = dict(REGIONS)
+
+# Store condiviso dalle route per leggere e scrivere i dati di sessione
+session_store = SessionStore('data')
+
+# Cache dell'HTML delle mappe già generate, indicizzata per (sessione, città, percorso)
+_MAP_CACHE = LRUCache(maxsize=32)
+
+# Oltre questo numero di città i marcatori numerati del percorso vengono omessi
+# (renderebbero la mappa pesante e illeggibile)
+NUMBERED_MARKERS_MAX_CITIES = 200
+
+# Stile dei marcatori numerati, definito una sola volta nella pagina invece che ripetuto in ogni marcatore
+WAYPOINT_MARKER_CSS = ("<style>.tsp-wp{font-family:sans-serif;color:black;background-color:rgba(255,255,255,0.7);"
+                       "border-radius:50%;width:20px;height:20px;text-align:center;line-height:20px;font-weight:bold;}</style>")
+
+# Tempo massimo (in secondi) concesso all'ILS per una richiesta web: la risoluzione è
+# sincrona, quindi oltre questo limite si restituisce il miglior percorso già trovato
+SOLVER_TIME_BUDGET = 20.0
+
+# Funzione JavaScript usata da FastMarkerCluster per creare ogni marcatore nel browser.
+# Ogni riga dei dati ha il formato [lat, lon, nome, popolazione].
+CITY_MARKER_CALLBACK = """function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'info-sign', markerColor: 'blue', prefix: 'glyphicon'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindTooltip(row[2]);
+    marker.bindPopup('<b>' + row[2] + '</b><br>Pop: ' + row[3], {maxWidth: 200});
+    return marker;
+}"""
+
 def get_regions():
     """
     Recupera un dizionario delle regioni italiane.
@@ -40,8 +85,162 @@ def get_regions():
         dict: Un dizionario che mappa i codici delle regioni (minuscoli, con trattini)
               ai loro nomi visualizzati (es. {"lombardia": "Lombardia"}).
     """
-    fetcher = NominatimFetcher()
-    return {key: value for key, value in fetcher.regions.items()}
+    return _REGIONS
+
+def compute_cities_hash(city_arrays):
+    """
+    Calcola un'impronta (hash) dell'elenco ordinato di città.
+
+    L'ordine conta: gli indici della matrice delle distanze corrispondono
+    alle posizioni delle città negli array.
+
+    Args:
+        city_arrays (dict): Array paralleli delle città ('name', 'lat', 'lon').
+
+    Returns:
+        str: L'hash esadecimale che identifica l'insieme di città.
+    """
+    digest = hashlib.sha1()
+    digest.update("\0".join(city_arrays['name'].tolist()).encode('utf-8'))
+    digest.update(city_arrays['lat'].tobytes())
+    digest.update(city_arrays['lon'].tobytes())
+    return digest.hexdigest()
+
+def load_or_compute_distance_matrix(session_id, city_arrays, session_data):
+    """
+    Restituisce la matrice delle distanze per le città della sessione, usando la cache su disco.
+
+    La matrice viene salvata in `data/dm_{session_id}.npy` e riletta (in modalità
+    memory-map, senza copie) nelle risoluzioni successive della stessa sessione,
+    ad esempio cambiando città di partenza o numero di iterazioni. La cache viene
+    invalidata se l'hash delle città memorizzato nella sessione non corrisponde.
+
+    Args:
+        session_id (str): L'identificatore della sessione.
+        city_arrays (dict): Array paralleli delle città, come restituiti da `load_cities`.
+        session_data (dict): Dati della sessione; la chiave 'cities_hash' viene aggiornata.
+
+    Returns:
+        numpy.ndarray: La matrice N x N delle distanze in km.
+    """
+    cache_path = f'data/dm_{session_id}.npy'
+    cities_hash = compute_cities_hash(city_arrays)
+
+    if session_data.get('cities_hash') == cities_hash and os.path.exists(cache_path):
+        try:
+            return np.load(cache_path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass # File di cache corrotto o illeggibile: la matrice viene ricalcolata
+
+    calculator = DistanceCalculator.from_arrays(city_arrays['name'], city_arrays['lat'], city_arrays['lon'])
+    # In float32 la matrice occupa metà della memoria (e della cache della CPU durante il 2-opt);
+    # la perdita di precisione è irrilevante per distanze in km
+    distance_matrix = calculator.calculate_distance_matrix(dtype=np.float32)
+    # Scrittura in un file temporaneo della stessa directory e sostituzione atomica: una richiesta
+    # concorrente che apre la cache vede sempre il file precedente o quello completo, mai uno parziale
+    tmp_path = f'{cache_path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, distance_matrix)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    session_data['cities_hash'] = cities_hash
+    return distance_matrix
+
+def save_cities_arrays(session_id, city_arrays):
+    """
+    Salva le città della sessione come array NumPy paralleli (struttura di array).
+
+    I dati vengono scritti in `data/cities_{session_id}.npz` con gli array
+    'name', 'lat', 'lon' e 'population', così le elaborazioni successive possono
+    accedere alle coordinate senza scorrere una lista di dizionari.
+
+    Args:
+        session_id (str): L'identificatore della sessione.
+        city_arrays (dict): Array paralleli delle città, come restituiti da
+                            `NominatimFetcher.fetch_cities_arrays`.
+
+    Returns:
+        str: Il nome del file creato (relativo alla directory 'data').
+    """
+    file_name = f'cities_{session_id}.npz'
+    np.savez(os.path.join('data', file_name), **city_arrays)
+    return file_name
+
+def load_cities(session_id, session_data):
+    """
+    Carica le città di una sessione come array paralleli.
+
+    Le sessioni contengono solo il riferimento 'cities_ref' al file `.npz` creato da
+    `save_cities_arrays`. Le sessioni create in precedenza, che memorizzano ancora la
+    lista 'cities', vengono convertite al volo (e il riferimento aggiunto).
+
+    Args:
+        session_id (str): L'identificatore della sessione.
+        session_data (dict): Dati della sessione.
+
+    Returns:
+        dict: Un dizionario {'name', 'lat', 'lon', 'population'} di numpy.ndarray.
+    """
+    if 'cities_ref' not in session_data:
+        session_data['cities_ref'] = save_cities_arrays(session_id, cities_to_arrays(session_data.pop('cities')))
+    with np.load(os.path.join('data', session_data['cities_ref'])) as npz:
+        return {key: npz[key] for key in ('name', 'lat', 'lon', 'population')}
+
+def build_route_map(city_names, lats, lons, populations, start_city_index, optimal_path_indices):
+    """
+    Costruisce la mappa interattiva Folium con le città e il percorso TSP.
+
+    Args:
+        city_names (list): Nomi delle città, nell'ordine degli indici del percorso.
+        lats (numpy.ndarray): Latitudini delle città.
+        lons (numpy.ndarray): Longitudini delle città.
+        populations (numpy.ndarray): Popolazioni delle città.
+        start_city_index (int): Indice della città di partenza.
+        optimal_path_indices (list): Percorso ottimale come lista di indici (con ritorno alla partenza).
+
+    Returns:
+        str: La rappresentazione HTML della mappa.
+    """
+    # Centra la mappa sulla città di partenza
+    map_center = [lats[start_city_index], lons[start_city_index]]
+    m = folium.Map(location=map_center, zoom_start=8)
+
+    # Aggiunge i marcatori delle città tramite un cluster disegnato lato browser:
+    # i dati viaggiano come un'unica lista JSON invece che come un marcatore HTML per città
+    cluster_rows = [[lats[i], lons[i], name, populations[i]]
+                    for i, name in enumerate(city_names) if i != start_city_index]
+    FastMarkerCluster(cluster_rows, callback=CITY_MARKER_CALLBACK, name="Città").add_to(m)
+
+    # La città di partenza resta sempre visibile, in rosso, fuori dal cluster
+    start_name = city_names[start_city_index]
+    folium.Marker(
+        location=map_center,
+        popup=folium.Popup(f"<b>{start_name}</b><br>Pop: {populations[start_city_index]}", max_width=200),
+        tooltip=start_name,
+        icon=folium.Icon(color="red", icon="info-sign")
+    ).add_to(m)
+
+    # Il percorso è raccolto in un FeatureGroup (un unico livello Leaflet)
+    route_layer = folium.FeatureGroup(name="Percorso").add_to(m)
+
+    # Aggiunge PolyLine per il percorso TSP (smooth_factor semplifica la linea ai livelli di zoom bassi)
+    path_coordinates = np.column_stack((lats[optimal_path_indices], lons[optimal_path_indices])).tolist()
+    folium.PolyLine(path_coordinates, color="green", weight=2.5, opacity=1, smooth_factor=2.0).add_to(route_layer)
+
+    # Opzionale: Aggiunge marcatori numerati per la sequenza del percorso, solo per percorsi non troppo affollati
+    if len(city_names) <= NUMBERED_MARKERS_MAX_CITIES:
+        m.get_root().html.add_child(folium.Element(WAYPOINT_MARKER_CSS))
+        for i, city_idx in enumerate(optimal_path_indices[:-1]): # Esclude il ritorno alla partenza per la numerazione
+            folium.Marker(
+                location=[lats[city_idx], lons[city_idx]],
+                icon=folium.DivIcon(html=f'<div class="tsp-wp">{i+1}</div>') # Marcatore numerato
+            ).add_to(route_layer)
+
+    return m._repr_html_() # Ottiene la rappresentazione HTML della mappa Folium
 
 @app.route('/')
 def index():
@@ -68,31 +267,37 @@ def fetch_cities():
     refresh_data = request.form.get('refresh_data') == 'on' # Verifica se è richiesto l'aggiornamento dei dati
 
     try:
-        fetcher = NominatimFetcher(user_agent="ItalianRegionsTSP-Web/1.0") #
-        cities_data = fetcher.fetch_cities(region, refresh=refresh_data, min_population=min_population) #
+        # Array paralleli letti dalla cache `.npz` della regione, senza decodificare il JSON
+        city_arrays = _FETCHER.fetch_cities_arrays(region, refresh=refresh_data, min_population=min_population)
+        city_count = len(city_arrays['name'])
 
-        if not cities_data:
+        if not city_count:
             return render_template('error.html', error_message=f"Nessuna città trovata per la regione '{region}' con popolazione minima {min_population}.")
 
         session_id = str(uuid.uuid4()) # Genera un ID univoco per questa sessione
+        # Le città vengono salvate come array paralleli in un file a parte:
+        # la sessione ne conserva solo il riferimento e resta piccola
         session_data = {
             'region': region,
-            'cities': cities_data,
+            'cities_ref': save_cities_arrays(session_id, city_arrays),
             'min_population': min_population
         }
 
-        # Memorizza i dati della sessione in un file JSON
-        with open(f'data/session_{session_id}.json', 'w', encoding='utf-8') as f:
-            json.dump(session_data, f)
+        # Memorizza i dati della sessione (file JSON + cache in memoria)
+        session_store.put(session_id, session_data)
 
         # Ordina le città per la visualizzazione: principalmente per popolazione (decrescente), poi per nome (crescente)
-        cities_for_display = sorted(cities_data, key=lambda x: (-x.get('population', 0), x['name']))
+        # (lexsort ordina per l'ultima chiave, a parità di questa per la precedente)
+        order = np.lexsort((city_arrays['name'], -city_arrays['population']))
+        names, lats, lons, populations = (city_arrays[key][order].tolist() for key in ('name', 'lat', 'lon', 'population'))
+        cities_for_display = [{'name': name, 'lat': lat, 'lon': lon, 'population': population}
+                              for name, lat, lon, population in zip(names, lats, lons, populations)]
 
         return render_template('select_city.html',
                               cities=cities_for_display,
                               region=region,
                               session_id=session_id,
-                              city_count=len(cities_data))
+                              city_count=city_count)
     except Exception as e:
         # Registra l'eccezione qui se necessario, es. app.logger.error(f"Errore nel recupero città: {e}")
         return render_template('error.html', error_message=str(e))
@@ -111,30 +316,32 @@ def solve_tsp():
 
     try:
         # Carica i dati della sessione
-        with open(f'data/session_{session_id}.json', 'r', encoding='utf-8') as f:
-            session_data = json.load(f)
+        session_data = session_store.get(session_id)
+        stored_session_data = dict(session_data) # Per riscrivere la sessione solo se cambia
 
-        cities = session_data['cities']
+        city_arrays = load_cities(session_id, session_data)
         region = session_data['region']
 
-        # Trova l'indice della città di partenza
-        start_city_index = 0
-        for i, city_obj in enumerate(cities):
-            if city_obj['name'] == start_city_name:
-                start_city_index = i
-                break
+        city_names = city_arrays['name'].tolist()
+
+        # L'ILS si stabilizza dopo un numero di iterazioni proporzionale a N:
+        # oltre 10 * N (con un minimo di 100) le iterazioni richieste non portano benefici
+        max_iterations = min(max_iterations, max(100, 10 * len(city_names)))
+
+        # Trova l'indice della città di partenza (prima città se il nome non è presente)
+        name_to_index = {name: i for i, name in enumerate(city_names)}
+        start_city_index = name_to_index.get(start_city_name, 0)
 
         start_time = time.time() # Avvia il cronometraggio del processo di risoluzione TSP
 
-        # Calcola le distanze e risolve il TSP
-        calculator = DistanceCalculator(cities) #
-        distance_matrix = calculator.calculate_distance_matrix() #
-        city_names = [city_obj['name'] for city_obj in cities]
+        # Calcola (o recupera dalla cache della sessione) le distanze e risolve il TSP
+        distance_matrix = load_or_compute_distance_matrix(session_id, city_arrays, session_data)
 
         solver = TSPSolver(distance_matrix, city_names) #
         (optimal_path_indices, total_distance), solver_instance = solver.solve(
             start_city_index=start_city_index,
-            max_iterations=max_iterations
+            max_iterations=max_iterations,
+            time_budget=SOLVER_TIME_BUDGET
         ), solver # Mantiene l'istanza del solver per accedere ai suoi metodi
 
         execution_time = time.time() - start_time # Calcola il tempo di esecuzione totale
@@ -142,55 +349,36 @@ def solve_tsp():
         path_with_names = solver_instance.get_path_with_names() #
         path_details = solver_instance.get_path_details() #
 
-        # --- Integrazione Mappa Folium ---
-        # Centra la mappa sulla città di partenza
-        map_center = [cities[start_city_index]['lat'], cities[start_city_index]['lon']]
-        m = folium.Map(location=map_center, zoom_start=8)
+        # Prepara una sola volta il blocco testuale delle tratte usato dal file scaricabile
+        download_text = "\n".join(f"{i}. {from_city} -> {to_city}: {distance:.2f} km"
+                                  for i, (from_city, to_city, distance) in enumerate(path_details, 1))
 
-        # Aggiunge marcatori per tutte le città
-        for i, city_obj in enumerate(cities):
-            popup_html = f"<b>{city_obj['name']}</b><br>Pop: {city_obj.get('population', 'N/A')}"
-            folium.Marker(
-                location=[city_obj['lat'], city_obj['lon']],
-                popup=folium.Popup(popup_html, max_width=200),
-                tooltip=city_obj['name'],
-                # Città di partenza in rosso, le altre in blu
-                icon=folium.Icon(color="red" if i == start_city_index else "blue", icon="info-sign")
-            ).add_to(m)
-
-        # Aggiunge PolyLine per il percorso TSP
-        path_coordinates = []
-        for city_idx in optimal_path_indices:
-            city_obj = cities[city_idx]
-            path_coordinates.append((city_obj['lat'], city_obj['lon']))
-        folium.PolyLine(path_coordinates, color="green", weight=2.5, opacity=1).add_to(m)
-
-        # Opzionale: Aggiunge marcatori numerati per la sequenza del percorso (può risultare affollato)
-        for i, city_idx in enumerate(optimal_path_indices[:-1]): # Esclude il ritorno alla partenza per la numerazione
-             city_obj = cities[city_idx]
-             folium.Marker(
-                 location=[city_obj['lat'], city_obj['lon']],
-                 icon=folium.DivIcon( # HTML personalizzato per marcatori numerati
-                    html=f"""<div style="font-family: sans-serif; color: black; background-color: rgba(255,255,255,0.7); border-radius: 50%; width: 20px; height: 20px; text-align: center; line-height: 20px; font-weight: bold;">{i+1}</div>"""
-                 )
-             ).add_to(m)
-
-        map_html = m._repr_html_() # Ottiene la rappresentazione HTML della mappa Folium
+        # --- Integrazione Mappa Folium ---
+        # La mappa dipende solo dalle città della sessione e dal percorso trovato:
+        # se la stessa combinazione è già stata disegnata, si riusa l'HTML generato
+        map_cache_key = (session_id, session_data['cities_hash'], tuple(optimal_path_indices))
+        map_html = _MAP_CACHE.get(map_cache_key)
+        if map_html is None:
+            map_html = build_route_map(city_names, city_arrays['lat'], city_arrays['lon'],
+                                       city_arrays['population'], start_city_index, optimal_path_indices)
+            _MAP_CACHE.put(map_cache_key, map_html)
         # --- Fine Integrazione Mappa Folium ---
 
-        # Aggiorna i dati della sessione con i risultati
-        session_data.update({
+        # La sessione viene riscritta solo se è cambiata (es. nuovo hash delle città o
+        # conversione di una sessione legacy); i risultati vanno in un file separato
+        if session_data != stored_session_data:
+            session_store.put(session_id, session_data)
+
+        session_store.put_results(session_id, {
             'start_city': start_city_name,
             'optimal_path': optimal_path_indices,
             'total_distance': total_distance,
             'execution_time': execution_time,
             'path_with_names': path_with_names,
             'path_details': path_details,
+            'download_text': download_text,
         })
 
-        with open(f'data/session_{session_id}.json', 'w', encoding='utf-8') as f:
-            json.dump(session_data, f)
-
         formatted_time = format_time(execution_time) #
 
         return render_template('results.html',
@@ -218,37 +406,46 @@ def download_results(session_id):
                           utilizzato per recuperare i risultati.
     """
     try:
-        # Carica i dati della sessione
-        with open(f'data/session_{session_id}.json', 'r', encoding='utf-8') as f:
-            session_data = json.load(f)
-
-        # Prepara il contenuto per il file di testo
-        results = []
-        results.append(f"RISULTATO DEL TSP PER LE CITTÀ DELLA {session_data['region'].upper()}")
-        results.append("=" * 50)
-        results.append("Algoritmo utilizzato: Nearest Neighbor + Iterated Local Search")
-        results.append(f"Città di partenza: {session_data['start_city']}")
-        results.append(f"Numero di città visitate: {len(session_data['optimal_path']) - 1}")
-        results.append(f"Distanza totale percorsa: {session_data['total_distance']:.2f} km")
-        results.append(f"Tempo di esecuzione: {format_time(session_data['execution_time'])}") #
-        results.append("\nPercorso ottimale:")
-        results.append(" -> ".join(session_data['path_with_names']))
-        results.append("\nDettagli del percorso:")
-
-        for i, (from_city, to_city, distance) in enumerate(session_data['path_details'], 1):
-            results.append(f"{i}. {from_city} -> {to_city}: {distance:.2f} km")
-
-        content = "\n".join(results)
-
-        # Crea un buffer BytesIO per contenere il contenuto testuale
-        buffer = BytesIO()
-        buffer.write(content.encode('utf-8'))
-        buffer.seek(0) # Resetta la posizione del buffer all'inizio
-
-        return send_file(buffer,
-                       as_attachment=True, # Attiva il comportamento di download
-                       download_name=f"tsp_{session_data['region']}_{session_data['start_city']}.txt",
-                       mimetype="text/plain")
+        # Carica i dati della sessione e i risultati dell'ultima risoluzione
+        session_data = session_store.get(session_id)
+        try:
+            results = session_store.get_results(session_id)
+        except FileNotFoundError: # Sessioni salvate con i risultati nel file principale
+            results = session_data
+
+        # Estrae subito i campi necessari, così una sessione incompleta produce la pagina
+        # di errore invece di interrompere il download a metà
+        region = session_data['region']
+        start_city = results['start_city']
+        visited_count = len(results['optimal_path']) - 1
+        total_distance = results['total_distance']
+        execution_time = results['execution_time']
+        path_with_names = results['path_with_names']
+        download_text = results.get('download_text')
+        if download_text is None: # Sessioni salvate prima dell'introduzione del testo precalcolato
+            download_text = "\n".join(f"{i}. {from_city} -> {to_city}: {distance:.2f} km"
+                                      for i, (from_city, to_city, distance) in enumerate(results['path_details'], 1))
+
+        # Il file viene composto e codificato una sola volta: il blocco delle tratte è già
+        # pronto, e un corpo in bytes permette a Flask di impostare subito Content-Length.
+        # L'header Content-Disposition (con il nome codificato secondo RFC 5987 per le città
+        # accentate e un ripiego ASCII) è costruito da `send_file`
+        content = "".join((
+            f"RISULTATO DEL TSP PER LE CITTÀ DELLA {region.upper()}\n",
+            "=" * 50 + "\n",
+            "Algoritmo utilizzato: Nearest Neighbor + Iterated Local Search\n",
+            f"Città di partenza: {start_city}\n",
+            f"Numero di città visitate: {visited_count}\n",
+            f"Distanza totale percorsa: {total_distance:.2f} km\n",
+            f"Tempo di esecuzione: {format_time(execution_time)}\n",
+            "\nPercorso ottimale:\n",
+            " -> ".join(path_with_names) + "\n",
+            "\nDettagli del percorso:\n",
+            download_text + "\n", # Blocco delle tratte già formattato in fase di risoluzione
+        )).encode('utf-8')
+
+        return send_file(io.BytesIO(content), mimetype="text/plain", as_attachment=True,
+                         download_name=f"tsp_{region}_{start_city}.txt")
     except Exception as e:
         return render_template('error.html', error_message=str(e))
 
@@ -264,17 +461,18 @@ def format_time(seconds):
     """
     if seconds < 60:
         return f"{seconds:.2f} secondi"
-    elif seconds < 3600:
-        minutes = int(seconds // 60)
-        secs = seconds % 60
+    # Una sola divisione per ciascuna unità di misura
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    if hours == 0:
         return f"{minutes} minuti e {secs:.2f} secondi"
-    else:
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = seconds % 60
-        return f"{hours} ore, {minutes} minuti e {secs:.2f} secondi"
+    return f"{hours} ore, {minutes} minuti e {secs:.2f} secondi"
 
 if __name__ == '__main__':
-    # Esegue il server di sviluppo Flask
-    # La modalità Debug dovrebbe essere False in un ambiente di produzione
-    app.run(debug=True)
\ No newline at end of file
+    # Esegue il server di sviluppo Flask (un thread per richiesta)
+    # La modalità Debug dovrebbe essere False in un ambiente di produzione.
+    # In produzione usare un server WSGI multi-thread, ad esempio:
+    #     gunicorn -w 1 --threads 8 --preload app:app
+    # I kernel Numba del solver rilasciano il GIL, quindi più richieste /solve_tsp
+    # possono essere risolte in parallelo sui diversi core.
+    app.run(debug=True, threaded=True)
\ No newline at end of file
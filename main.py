@@ -12,25 +12,65 @@ import sys
 import argparse
 import time
 import os
+import uuid
+import hashlib
+import numpy as np
+import numba
 
 # Importa i moduli personalizzati dalla directory src
-from src.data_fetcher import NominatimFetcher
+from src.data_fetcher import NominatimFetcher, REGIONS
 from src.distance_matrix import DistanceCalculator
-from src.visualization import TSPVisualizer # Per generare visualizzazioni statiche della mappa
 from src.NN_ILS import TSPSolver # L'algoritmo principale di risoluzione TSP
 
+def normalize_name(value):
+    """
+    Normalizza un nome passato da riga di comando (spazi esterni rimossi, casefold).
+
+    Args:
+        value (str): Il valore fornito dall'utente.
+
+    Returns:
+        str: Il valore normalizzato.
+    """
+    return value.strip().casefold()
+
+def positive_int(value):
+    """
+    Converte un argomento della riga di comando in un intero strettamente positivo.
+
+    Args:
+        value (str): Il valore fornito dall'utente.
+
+    Returns:
+        int: Il valore convertito.
+
+    Raises:
+        argparse.ArgumentTypeError: Se il valore non è un intero maggiore di zero.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' non è un numero intero")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"deve essere un intero positivo (ricevuto {number})")
+    return number
+
 def parse_arguments():
     """
     Analizza gli argomenti della riga di comando per il risolutore TSP.
 
+    I nomi di regione e città di partenza vengono normalizzati una sola volta qui;
+    `args.region_display` contiene il nome leggibile della regione.
+
     Returns:
         argparse.Namespace: Un oggetto contenente gli argomenti analizzati dalla riga di comando.
     """
     parser = argparse.ArgumentParser(description='Risolutore del TSP per le regioni italiane') #
+    regions = REGIONS # Codici regione validi e relativi nomi leggibili
 
-    parser.add_argument('--region', type=str, default="basilicata", #
+    parser.add_argument('--region', type=normalize_name, default="basilicata", choices=list(regions), #
                         help='Nome della regione italiana (default: basilicata). Es., "lombardia", "sicilia".')
-    parser.add_argument('--start-city', type=str, default="Potenza", #
+    parser.add_argument('--start-city', type=normalize_name, default="Potenza", #
                         help='Nome della città di partenza (default: Potenza). Deve essere una città della regione selezionata.')
     parser.add_argument('--min-population', type=int, default=1000, #
                         help='Popolazione minima per includere una città (default: 1000).')
@@ -46,8 +86,15 @@ def parse_arguments():
                         help='File di output per i risultati testuali (es., "risultati.txt"). Il percorso è relativo a static/.')
     parser.add_argument('--max-iterations', type=int, default=1000, #
                         help="Numero massimo di iterazioni per l'algoritmo Iterated Local Search (ILS) (default: 1000).")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Numero di processi che eseguono ILS indipendenti in parallelo (default: numero di CPU).")
+    parser.add_argument('--threads', type=positive_int, default=None,
+                        help="Numero di thread per il calcolo della matrice delle distanze (default: tutti i core). "
+                             "Valori oltre NUMBA_NUM_THREADS vengono ridotti a tale limite.")
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    args.region_display = regions[args.region]
+    return args
 
 def find_city_index(city_name, cities):
     """
@@ -65,18 +112,20 @@ def find_city_index(city_name, cities):
     Returns:
         int: L'indice della città trovata nella lista.
     """
-    city_name_lower = city_name.lower()
+    # Normalizza i nomi una sola volta; casefold gestisce il Unicode meglio di lower
+    city_name_folded = city_name.casefold()
+    folded_names = [city['name'].casefold() for city in cities]
 
-    # Tenta prima una corrispondenza esatta
-    for i, city in enumerate(cities):
-        if city['name'].lower() == city_name_lower:
-            return i
+    # Tenta prima una corrispondenza esatta (la prima occorrenza, come nella ricerca sequenziale)
+    exact_matches = {}
+    for i, name in enumerate(folded_names):
+        exact_matches.setdefault(name, i)
+    if city_name_folded in exact_matches:
+        return exact_matches[city_name_folded]
 
     # Se non c'è corrispondenza esatta, cerca corrispondenze parziali
-    matching_cities = []
-    for i, city in enumerate(cities):
-        if city_name_lower in city['name'].lower():
-            matching_cities.append((i, city['name']))
+    matching_cities = [(i, cities[i]['name']) for i, name in enumerate(folded_names)
+                       if city_name_folded in name]
 
     if not matching_cities:
         print(f"Attenzione: Città '{city_name}' non trovata. Verrà utilizzata la prima città disponibile: {cities[0]['name']}.")
@@ -122,11 +171,11 @@ def fetch_cities_data(args):
     """
     fetcher = NominatimFetcher(user_agent=args.user_agent) #
     try:
-        print(f"Recupero delle città per la regione: {args.region.title()} (Pop. min: {args.min_population})")
+        print(f"Recupero delle città per la regione: {args.region_display} (Pop. min: {args.min_population})")
         cities = fetcher.fetch_cities(args.region, refresh=args.refresh_data,
                                      min_population=args.min_population) #
         if not cities:
-            print(f"Errore: Nessuna città trovata per la regione '{args.region.title()}' con i criteri specificati.")
+            print(f"Errore: Nessuna città trovata per la regione '{args.region_display}' con i criteri specificati.")
             sys.exit(1)
         return cities
     except Exception as e:
@@ -134,28 +183,107 @@ def fetch_cities_data(args):
         print("Controlla la tua connessione internet o la validità della regione specificata.")
         sys.exit(1)
 
-def solve_tsp_problem(cities, start_city_index, max_iterations):
+def load_or_compute_distance_matrix(cities, region, min_population):
+    """
+    Restituisce la matrice delle distanze, riutilizzando quella salvata su disco
+    da un'esecuzione precedente con gli stessi parametri e le stesse città.
+
+    La cache è il file `data/dist_{hash}.npy`, dove l'hash dipende da regione,
+    popolazione minima, nomi e coordinate delle città: se i dati vengono aggiornati
+    (es. con --refresh-data) la matrice viene ricalcolata automaticamente.
+
+    Args:
+        cities (list): Una lista di dizionari città.
+        region (str): Il codice della regione (già normalizzato).
+        min_population (int): La popolazione minima usata per filtrare le città.
+
+    Returns:
+        numpy.ndarray: La matrice N x N delle distanze in km (float32).
+    """
+    key = hashlib.blake2b(digest_size=16)
+    key.update(f"{region}|{min_population}|{len(cities)}".encode('utf-8'))
+    for city in cities:
+        key.update(f"|{city['name']}|{city['lat']}|{city['lon']}".encode('utf-8'))
+    cache_path = f"data/dist_{key.hexdigest()}.npy"
+
+    if os.path.exists(cache_path):
+        try:
+            print("Caricamento della matrice delle distanze dalla cache...")
+            return np.load(cache_path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass # File di cache corrotto o illeggibile: la matrice viene ricalcolata
+
+    calculator = DistanceCalculator(cities) #
+    # La matrice viene salvata e passata al solver in float32 contiguo: il 2-opt accede
+    # ripetutamente alle distanze, e dimezzarne la dimensione migliora l'uso della cache della CPU
+    distance_matrix = calculator.calculate_distance_matrix(dtype=np.float32, parallel=True)
+    # Scrittura in un file temporaneo e sostituzione atomica (come nell'app web): un'esecuzione
+    # interrotta o concorrente non lascia mai un file parziale sotto una chiave di cache valida
+    tmp_path = f'{cache_path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, distance_matrix)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return distance_matrix
+
+def solve_tsp_problem(cities, city_names, start_city_index, max_iterations, region, min_population, workers=1):
     """
     Risolve il TSP per la lista di città data.
 
+    Con più di un processo, vengono eseguiti `workers` ILS indipendenti (con semi
+    diversi e `max_iterations` iterazioni ciascuno) e si tiene il percorso migliore: ogni processo
+    ha l'intero budget di iterazioni, quindi il risultato non è mai peggiore di quello con un solo processo.
+
     Args:
         cities (list): Una lista di dizionari città.
+        city_names (numpy.ndarray): Array (dtype object) dei nomi delle città, nell'ordine di `cities`.
         start_city_index (int): L'indice della città di partenza nella lista `cities`.
         max_iterations (int): Numero massimo di iterazioni per l'algoritmo ILS.
+        region (str): Il nome della regione (usato per la cache della matrice delle distanze).
+        min_population (int): La popolazione minima (usata per la cache della matrice delle distanze).
+        workers (int, optional): Numero di processi da utilizzare. Default a 1.
 
     Returns:
         tuple: Una tupla contenente:
             - tuple: (optimal_path_indices, total_distance)
             - TSPSolver: L'istanza del solver utilizzata.
     """
-    calculator = DistanceCalculator(cities) #
-    distance_matrix = calculator.calculate_distance_matrix() #
-    city_names = [city['name'] for city in cities]
+    distance_matrix = load_or_compute_distance_matrix(cities, region, min_population)
 
     solver = TSPSolver(distance_matrix, city_names) #
-    solver_params = {"start_city_index": start_city_index, "max_iterations": max_iterations}
-    solution_data, solver_instance = solver.solve(**solver_params), solver # Mantiene l'istanza
-    return solution_data, solver_instance
+    if workers <= 1:
+        return solver.solve(start_city_index=start_city_index, max_iterations=max_iterations), solver
+
+    solution_data = solver.solve_parallel(start_city_index=start_city_index, max_iterations=max_iterations,
+                                          n_workers=workers)
+    return solution_data, solver
+
+def build_path_outputs(optimal_path_indices, city_names, distance_matrix):
+    """
+    Costruisce in un solo passaggio i nomi del percorso e i dettagli delle tratte.
+
+    Le distanze delle tratte e i nomi sono estratti con un'unica indicizzazione
+    vettoriale ciascuno (`D[path[:-1], path[1:]]`, `city_names[path]`) invece che una tratta alla volta.
+
+    Args:
+        optimal_path_indices (list): Percorso ottimale come lista di indici (con ritorno alla partenza).
+        city_names (numpy.ndarray): Array (dtype object) dei nomi delle città, nell'ordine degli indici.
+        distance_matrix (numpy.ndarray): Matrice N x N delle distanze.
+
+    Returns:
+        tuple: Una tupla contenente:
+            - list: I nomi delle città nel percorso.
+            - list: Tuple (citta_partenza, citta_arrivo, distanza) per ogni tratta.
+    """
+    path = np.asarray(optimal_path_indices)
+    legs = distance_matrix[path[:-1], path[1:]].tolist()
+    path_with_names = city_names[path].tolist()
+    path_details = list(zip(path_with_names[:-1], path_with_names[1:], legs))
+    return path_with_names, path_details
 
 def format_time_duration(seconds):
     """
@@ -169,15 +297,12 @@ def format_time_duration(seconds):
     """
     if seconds < 60:
         return f"{seconds:.2f} secondi"
-    elif seconds < 3600: # Meno di un'ora
-        minutes = int(seconds // 60)
-        secs = seconds % 60
+    # Una sola divisione per ciascuna unità di misura
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    if hours == 0: # Meno di un'ora
         return f"{minutes} minuti e {secs:.2f} secondi"
-    else: # Un'ora o più
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = seconds % 60
-        return f"{hours} ore, {minutes} minuti e {secs:.2f} secondi"
+    return f"{hours} ore, {minutes} minuti e {secs:.2f} secondi" # Un'ora o più
 
 def display_tsp_results(region, start_city_name, optimal_path_indices, total_distance,
                         execution_time, path_with_names, path_details):
@@ -206,14 +331,17 @@ def display_tsp_results(region, start_city_name, optimal_path_indices, total_dis
     print(f"    {' -> '.join(path_with_names)}")
 
     print("\n  Dettagli del percorso (tratte):")
-    for i, (from_city, to_city, distance) in enumerate(path_details, 1):
-        print(f"    {i:2d}. Da {from_city:<20} a {to_city:<20}: {distance:>7.2f} km")
+    # Le tratte vengono formattate tutte insieme e scritte con un'unica chiamata
+    leg_lines = [f"    {i:2d}. Da {from_city:<20} a {to_city:<20}: {distance:>7.2f} km"
+                 for i, (from_city, to_city, distance) in enumerate(path_details, 1)]
+    if leg_lines:
+        sys.stdout.write("\n".join(leg_lines) + "\n")
     print("="*60)
 
 def prepare_results_for_output_file(region, start_city_name, optimal_path_indices,
                                     total_distance, execution_time, path_with_names, path_details):
     """
-    Prepara una lista di stringhe contenenti i risultati del TSP, formattati per il salvataggio su file di testo.
+    Produce, una alla volta, le righe di testo con i risultati del TSP da salvare su file.
 
     Args:
         region (str): Il nome della regione italiana.
@@ -224,48 +352,42 @@ def prepare_results_for_output_file(region, start_city_name, optimal_path_indice
         path_with_names (list): Lista dei nomi delle città nel percorso ottimale.
         path_details (list): Lista di tuple, ognuna delle quali dettaglia un segmento del percorso.
 
-    Returns:
-        list: Una lista di stringhe, dove ogni stringa è una riga per il file di output.
+    Yields:
+        str: Una riga per il file di output (senza carattere di fine riga).
     """
-    results_data = [
-        f"RISULTATO DEL TSP PER LE CITTÀ DELLA REGIONE {region.upper()}",
-        "="*50,
-        "Algoritmo utilizzato: Nearest Neighbor + Iterated Local Search (ILS)",
-        f"Città di partenza: {start_city_name}",
-        f"Numero di città visitate (esclusa partenza ripetuta): {len(optimal_path_indices) - 1}",
-        f"Distanza totale percorsa: {total_distance:.2f} km",
-        f"Tempo di esecuzione del solver: {format_time_duration(execution_time)}",
-        "\nPercorso ottimale:",
-        " -> ".join(path_with_names),
-        "\nDettagli del percorso (tratte):"
-    ]
+    yield f"RISULTATO DEL TSP PER LE CITTÀ DELLA REGIONE {region.upper()}"
+    yield "="*50
+    yield "Algoritmo utilizzato: Nearest Neighbor + Iterated Local Search (ILS)"
+    yield f"Città di partenza: {start_city_name}"
+    yield f"Numero di città visitate (esclusa partenza ripetuta): {len(optimal_path_indices) - 1}"
+    yield f"Distanza totale percorsa: {total_distance:.2f} km"
+    yield f"Tempo di esecuzione del solver: {format_time_duration(execution_time)}"
+    yield "\nPercorso ottimale:"
+    yield " -> ".join(path_with_names)
+    yield "\nDettagli del percorso (tratte):"
 
     for i, (from_city, to_city, distance) in enumerate(path_details, 1):
-        results_data.append(f"{i}. Da {from_city} a {to_city}: {distance:.2f} km")
-
-    return results_data
+        yield f"{i}. Da {from_city} a {to_city}: {distance:.2f} km"
 
 def save_results_to_file(output_file_path, results_data_lines):
     """
     Salva i risultati TSP formattati in un file di testo specificato.
-
-    Assicura che la directory per il file di output esista prima di scrivere.
+    La directory del file deve già esistere (viene creata da `main`).
 
     Args:
         output_file_path (str): Il percorso completo del file di testo di output.
-        results_data_lines (list): Una lista di stringhe da scrivere nel file.
+        results_data_lines (iterable): Le righe da scrivere nel file (lista o generatore).
     """
     try:
-        os.makedirs(os.path.dirname(output_file_path), exist_ok=True) #
-        with open(output_file_path, 'w', encoding='utf-8') as f:
-            for line in results_data_lines:
-                f.write(line + "\n")
+        # Un'unica scrittura del contenuto già composto; newline='\n' evita la traduzione dei fine riga
+        with open(output_file_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write("\n".join(results_data_lines) + "\n")
         print(f"\nRisultati salvati con successo in: {output_file_path}")
     except IOError as e:
         print(f"Errore durante il salvataggio dei risultati su file '{output_file_path}': {e}")
 
 def manage_visualization(cities, optimal_path_indices, start_city_name, total_distance,
-                         should_visualize, save_visualization_path):
+                         should_visualize, save_visualization_path, region_name="N/A"):
     """
     Gestisce la creazione e la visualizzazione/salvataggio della visualizzazione del percorso TSP.
 
@@ -276,22 +398,19 @@ def manage_visualization(cities, optimal_path_indices, start_city_name, total_di
         total_distance (float): Distanza totale del percorso.
         should_visualize (bool): Se True, visualizza la mappa.
         save_visualization_path (str or None): Percorso per salvare l'immagine della mappa, o None.
+        region_name (str, optional): Nome della regione. Default a "N/A".
     """
+    # Importato solo quando serve: matplotlib rallenta sensibilmente l'avvio della CLI
+    from src.visualization import TSPVisualizer # Per generare visualizzazioni statiche della mappa
+
     print("\nGenerazione della visualizzazione della mappa...")
-    visualizer = TSPVisualizer(cities, optimal_path_indices) #
+    visualizer = TSPVisualizer(cities, optimal_path_indices, region_name=region_name) #
 
     title = (f"Percorso TSP per {start_city_name} ({len(optimal_path_indices)-1} città) - "
              f"Distanza: {total_distance:.2f} km")
 
-    # Assicura che la directory esista se si salva la visualizzazione
-    if save_visualization_path:
-        try:
-            os.makedirs(os.path.dirname(save_visualization_path), exist_ok=True) #
-        except OSError as e:
-            print(f"Errore nella creazione della cartella per la visualizzazione '{save_visualization_path}': {e}")
-            save_visualization_path = None # Impedisce il tentativo di salvataggio se la creazione della directory fallisce
-
-    visualizer.plot_path(title=title, save_path=save_visualization_path) #
+    # Se la mappa va solo salvata non serve inizializzare un backend grafico interattivo
+    visualizer.plot_path(title=title, save_path=save_visualization_path, headless=not should_visualize) #
 
     if should_visualize:
         print("Visualizzazione del percorso (chiudere la finestra per continuare)...")
@@ -308,42 +427,54 @@ def main():
     e gestisce la visualizzazione e l'output su file in base ai flag utente.
     """
     args = parse_arguments() #
-    overall_start_time = time.time() # Cronometra l'intero processo, incluso il recupero dati
-
-    # Assicura che le directory necessarie esistano (data per la cache, static per gli output)
-    if not os.path.exists('data'): #
-        os.makedirs('data') #
-    if not os.path.exists('static'): # Per --output
-        os.makedirs('static') #
-    if not os.path.exists('static/images'): # Per --save-visualization
-        os.makedirs('static/images', exist_ok=True) #
+    if args.threads:
+        # Limita (o fissa) i thread usati dai kernel paralleli di Numba
+        numba.set_num_threads(min(args.threads, numba.config.NUMBA_NUM_THREADS))
+    # Cronometra l'intero processo, incluso il recupero dati. perf_counter_ns è monotono
+    # (non risente di aggiustamenti dell'orologio di sistema) e lavora con interi in nanosecondi
+    overall_start_ns = time.perf_counter_ns()
+
+    # Percorsi dei file di output, relativi a static/ e static/images/
+    output_file_path = os.path.join('static', args.output) if args.output else None
+    save_viz_path = os.path.join('static', 'images', args.save_visualization) if args.save_visualization else None
+
+    # Crea in un unico passaggio tutte le directory necessarie: data per la cache,
+    # static e static/images per gli output (incluse eventuali sottocartelle indicate dall'utente)
+    directories = {'data', 'static', os.path.join('static', 'images')}
+    directories.update(os.path.dirname(path) for path in (output_file_path, save_viz_path) if path)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
 
     # 1. Recupera i dati delle città
     cities = fetch_cities_data(args)
-    print(f"Recuperate {len(cities)} città per la regione {args.region.title()}.")
+    print(f"Recuperate {len(cities)} città per la regione {args.region_display}.")
 
     # 2. Determina la città di partenza
+    # I nomi delle città vengono raccolti una sola volta, in un array che consente
+    # l'indicizzazione vettoriale (es. city_names[percorso]) nelle fasi successive
+    city_names = np.array([city['name'] for city in cities], dtype=object)
     start_city_index = find_city_index(args.start_city, cities) #
-    start_city_name = cities[start_city_index]['name']
+    start_city_name = city_names[start_city_index]
     print(f"\nCittà di partenza selezionata: {start_city_name}")
 
     # 3. Risolve il TSP
     print("\nAvvio della risoluzione del TSP...")
-    tsp_solve_start_time = time.time()
+    tsp_solve_start_ns = time.perf_counter_ns()
     (optimal_path_indices, total_distance), solver_instance = solve_tsp_problem(
-        cities, start_city_index, args.max_iterations
+        cities, city_names, start_city_index, args.max_iterations, args.region, args.min_population,
+        workers=args.workers
     )
-    tsp_execution_time = time.time() - tsp_solve_start_time
+    tsp_execution_time = (time.perf_counter_ns() - tsp_solve_start_ns) / 1e9 # In secondi
 
     # 4. Prepara e visualizza i risultati
-    path_with_names = solver_instance.get_path_with_names() #
-    path_details = solver_instance.get_path_details() #
+    path_with_names, path_details = build_path_outputs(
+        optimal_path_indices, city_names, solver_instance.distance_matrix
+    )
     display_tsp_results(args.region, start_city_name, optimal_path_indices, total_distance,
                         tsp_execution_time, path_with_names, path_details) #
 
     # 5. Salva i risultati su file di testo se richiesto
-    if args.output:
-        output_file_path = os.path.join('static', args.output) # Salva nella directory 'static'
+    if output_file_path:
         results_to_save = prepare_results_for_output_file(
             args.region, start_city_name, optimal_path_indices, total_distance,
             tsp_execution_time, path_with_names, path_details
@@ -351,16 +482,11 @@ def main():
         save_results_to_file(output_file_path, results_to_save) #
 
     # 6. Gestisce la visualizzazione (mostra o salva la mappa)
-    if args.visualize or args.save_visualization:
-        save_viz_path = None
-        if args.save_visualization:
-            # Salva nella directory 'static/images'
-            save_viz_path = os.path.join('static', 'images', args.save_visualization) #
-
+    if args.visualize or save_viz_path:
         manage_visualization(cities, optimal_path_indices, start_city_name, total_distance,
-                           args.visualize, save_viz_path) #
+                           args.visualize, save_viz_path, region_name=args.region) #
 
-    overall_execution_time = time.time() - overall_start_time
+    overall_execution_time = (time.perf_counter_ns() - overall_start_ns) / 1e9 # In secondi
     print(f"\nProcesso completato in {format_time_duration(overall_execution_time)} (tempo totale).")
 
 if __name__ == "__main__":
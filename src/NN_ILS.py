@@ -1,6 +1,65 @@
+import io
+import os
 import time
 import random
-import numpy as np # Usato implicitamente per la matrice delle distanze
+import contextlib
+import numpy as np
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from src.NN_ILS_numba import _nn_tour, _alternating_local_search, _ils_iterations, _held_karp, _path_length # Kernel compilati con Numba
+
+# Fino a questo numero di città il TSP viene risolto in modo esatto (Held-Karp),
+# più rapidamente di quanto richiederebbe l'ILS
+HELD_KARP_MAX_CITIES = 15
+
+# Numero di città più vicine considerate come candidate per le mosse 2-opt e Or-opt
+NEIGHBOR_LIST_SIZE = 20
+
+# Se True, l'ILS verifica ogni lunghezza aggiornata per differenze ricalcolandola
+# da zero (O(N) per iterazione): utile solo per il debugging
+DEBUG_CHECK_LENGTHS = False
+
+# Kernel usati da NN, ricerca locale, ILS e Held-Karp: le versioni compilate e quelle Python pure
+# (`py_func` è la funzione originale, eseguita senza compilazione JIT), scelte a ogni `solve`
+_COMPILED_KERNELS = SimpleNamespace(nn_tour=_nn_tour, alternating_local_search=_alternating_local_search,
+                                    ils_iterations=_ils_iterations, held_karp=_held_karp)
+_PYTHON_KERNELS = SimpleNamespace(nn_tour=_nn_tour.py_func, alternating_local_search=_alternating_local_search.py_func,
+                                  ils_iterations=_ils_iterations.py_func, held_karp=_held_karp.py_func)
+
+def _parallel_solve_worker(shm_name, shape, dtype, city_names, start_city_index, max_iterations, time_budget, seed):
+    """
+    Esegue una risoluzione indipendente in un processo separato (vedi `TSPSolver.solve_parallel`).
+
+    La matrice delle distanze non viene copiata: il processo si collega al blocco
+    di memoria condivisa creato dal processo principale.
+
+    Args:
+        shm_name (str): Nome del blocco di memoria condivisa con la matrice.
+        shape (tuple): Dimensioni della matrice.
+        dtype (str): Tipo degli elementi della matrice.
+        city_names (list): Nomi delle città.
+        start_city_index (int): Indice della città di partenza.
+        max_iterations (int): Numero massimo di iterazioni dell'ILS.
+        time_budget (float): Tempo massimo in secondi per l'ILS, o None.
+        seed (int): Seme del generatore casuale usato dalle perturbazioni.
+
+    Returns:
+        tuple: (percorso_migliore, distanza_migliore)
+    """
+    random.seed(seed)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        distance_matrix = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        solver = TSPSolver(distance_matrix, city_names)
+        with contextlib.redirect_stdout(io.StringIO()): # Evita di mescolare i log dei processi
+            path, distance = solver.solve(start_city_index=start_city_index, max_iterations=max_iterations,
+                                          time_budget=time_budget)
+        del solver, distance_matrix # Rilascia i riferimenti al buffer prima di chiuderlo
+    finally:
+        shm.close()
+    return path, distance
 
 class TSPSolver:
     """
@@ -14,11 +73,15 @@ class TSPSolver:
         Inizializza il risolutore TSP.
 
         Args:
-            distance_matrix (numpy.ndarray): Matrice N x N delle distanze tra le città.
-            city_names (list): Lista dei nomi delle città, corrispondente agli indici
+            distance_matrix (numpy.ndarray): Matrice N x N delle distanze tra le città
+                                             (viene convertita in float32 se di altro tipo).
+            city_names (list): Lista (o array NumPy) dei nomi delle città, corrispondente agli indici
                                della matrice delle distanze.
         """
-        self.distance_matrix = distance_matrix
+        # I kernel Numba lavorano su un array float32 contiguo: metà dei byte letti per riga
+        # rispetto al float64 nel 2-opt, e un solo tipo per cui compilarli. La conversione
+        # avviene una sola volta (nessuna copia se la matrice è già in questo formato)
+        self.distance_matrix = np.ascontiguousarray(distance_matrix, dtype=np.float32)
         self.city_names = city_names
         self.n_cities = len(city_names)
         if self.n_cities == 0:
@@ -28,16 +91,47 @@ class TSPSolver:
         elif self.n_cities > 1 and self.distance_matrix.shape != (self.n_cities, self.n_cities):
             raise ValueError("Dimensioni della matrice delle distanze non coerenti con il numero di città.")
 
+        self.neighbors = self._build_neighbor_lists(NEIGHBOR_LIST_SIZE)
+
         self.best_path_indices = None # Memorizza gli indici delle città nel percorso migliore
         self.best_distance = float('inf') # Memorizza la distanza del percorso migliore
 
-    def solve(self, start_city_index=0, max_iterations=1000):
+    def _build_neighbor_lists(self, k):
+        """
+        Calcola, per ogni città, le `k` città più vicine in ordine di distanza crescente.
+
+        Args:
+            k (int): Numero di vicini per città (limitato a N - 1).
+
+        Returns:
+            numpy.ndarray: Matrice `int32` N x k di indici di città.
+        """
+        k = min(k, self.n_cities - 1)
+        if k <= 0:
+            return np.empty((self.n_cities, 0), dtype=np.int32)
+        distances = self.distance_matrix.copy()
+        np.fill_diagonal(distances, np.inf) # Una città non è vicina di se stessa (anche con coordinate duplicate)
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k] # Selezione O(N) per riga, senza ordinare tutto
+        order = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1)
+        return np.take_along_axis(nearest, order, axis=1).astype(np.int32)
+
+    def solve(self, start_city_index=0, max_iterations=1000, time_budget=None, use_numba=True):
         """
         Risolve il TSP partendo da una città specifica.
 
+        Fino a `HELD_KARP_MAX_CITIES` città la soluzione è esatta (Held-Karp);
+        oltre viene usata l'euristica Nearest Neighbor + ILS.
+
         Args:
             start_city_index (int, optional): Indice della città di partenza. Default a 0.
             max_iterations (int, optional): Numero massimo di iterazioni per l'ILS. Default a 1000.
+            time_budget (float, optional): Tempo massimo in secondi concesso all'ILS; allo
+                                           scadere viene restituito il miglior percorso trovato.
+                                           Default a None (nessun limite).
+            use_numba (bool, optional): Se False, usa le versioni Python pure dei kernel
+                                        (utile per il debugging; i kernel richiamati al loro
+                                        interno, come 2-opt e Or-opt, restano compilati).
+                                        Default a True.
 
         Returns:
             tuple: Una tupla contenente:
@@ -47,6 +141,9 @@ class TSPSolver:
         if not (0 <= start_city_index < self.n_cities):
             raise ValueError(f"Indice della città di partenza '{start_city_index}' non valido per {self.n_cities} città.")
 
+        # La scelta vale solo per questa chiamata: i kernel vengono passati ai metodi interni
+        kernels = _COMPILED_KERNELS if use_numba else _PYTHON_KERNELS
+
         # Caso speciale: se c'è solo una città, il percorso è banale
         if self.n_cities == 1:
             self.best_path_indices = [start_city_index, start_city_index] # Ritorna a se stessa
@@ -57,9 +154,19 @@ class TSPSolver:
         start_time_solve = time.time()
         print(f"Avvio risoluzione TSP da '{self.city_names[start_city_index]}' con {self.n_cities} città...")
 
+        # Con poche città la programmazione dinamica trova il percorso ottimo in pochi millisecondi
+        if self.n_cities <= HELD_KARP_MAX_CITIES:
+            print("Risoluzione esatta con l'algoritmo di Held-Karp...")
+            tour, _ = kernels.held_karp(self.distance_matrix, start_city_index)
+            self.best_path_indices = tour.tolist() + [start_city_index]
+            self.best_distance = self._calculate_path_length(self.best_path_indices)
+            print(f"Risoluzione TSP completata in {time.time() - start_time_solve:.2f} secondi.")
+            print(f"Distanza ottimale finale: {self.best_distance:.2f} km")
+            return self.best_path_indices, self.best_distance
+
         # Fase 1: Costruzione della soluzione iniziale con Nearest Neighbor
         print("Fase 1: Costruzione del percorso iniziale con Nearest Neighbor...")
-        initial_path = self._nearest_neighbor(start_city_index)
+        initial_path = self._nearest_neighbor(start_city_index, kernels)
         initial_distance = self._calculate_path_length(initial_path)
         print(f"Distanza del percorso iniziale (NN): {initial_distance:.2f} km")
 
@@ -71,11 +178,14 @@ class TSPSolver:
         # Per 2 città, NN è già ottimale (A->B->A).
         if self.n_cities > 2 :
             print(f"Fase 2: Ottimizzazione con Iterated Local Search (max {max_iterations} iterazioni)...")
-            optimized_path, optimized_distance = self._iterated_local_search(
-                initial_path, initial_distance, max_iterations=max_iterations
+            optimized_path, _ = self._iterated_local_search(
+                initial_path, initial_distance, max_iterations=max_iterations,
+                time_budget=time_budget, kernels=kernels
             )
             self.best_path_indices = optimized_path
-            self.best_distance = optimized_distance
+            # Le distanze dell'ILS sono aggiornate per differenze: la lunghezza finale
+            # viene ricalcolata una volta sul percorso, senza errori di arrotondamento accumulati
+            self.best_distance = self._calculate_path_length(optimized_path)
         else:
             print("Fase 2: Ottimizzazione ILS saltata (meno di 3 città).")
 
@@ -91,185 +201,208 @@ class TSPSolver:
 
         return self.best_path_indices, self.best_distance
 
-    def _nearest_neighbor(self, start_node_idx):
+    def solve_parallel(self, start_city_index=0, max_iterations=1000, n_workers=None, seeds=None, time_budget=None):
+        """
+        Esegue più risoluzioni indipendenti in parallelo, su processi diversi, e tiene la migliore.
+
+        Ogni processo esegue NN + ILS con un proprio seme casuale: le ILS esplorano
+        minimi locali diversi e il tempo totale resta quello di una singola esecuzione.
+        La matrice delle distanze viene copiata una sola volta in memoria condivisa.
+        Con `n_workers` pari a 1, o con poche città (soluzione esatta), equivale a `solve`.
+
+        Args:
+            start_city_index (int, optional): Indice della città di partenza. Default a 0.
+            max_iterations (int, optional): Numero massimo di iterazioni dell'ILS di ciascun processo.
+                                            Default a 1000.
+            n_workers (int, optional): Numero di processi. Default a None (numero di CPU).
+            seeds (list, optional): Semi casuali, uno per processo. Default a None (0, 1, ..., n_workers - 1).
+            time_budget (float, optional): Tempo massimo in secondi per l'ILS di ciascun processo.
+                                           Default a None (nessun limite).
+
+        Returns:
+            tuple: Una tupla contenente:
+                - list: Il percorso migliore (lista di indici di città).
+                - float: La distanza totale del percorso migliore.
+        """
+        if seeds is None:
+            seeds = list(range(n_workers if n_workers is not None else (os.cpu_count() or 1)))
+        n_workers = len(seeds)
+        if n_workers <= 1 or self.n_cities <= HELD_KARP_MAX_CITIES:
+            if n_workers == 1:
+                random.seed(seeds[0])
+            return self.solve(start_city_index=start_city_index, max_iterations=max_iterations, time_budget=time_budget)
+        if not (0 <= start_city_index < self.n_cities):
+            raise ValueError(f"Indice della città di partenza '{start_city_index}' non valido per {self.n_cities} città.")
+
+        matrix = self.distance_matrix
+        city_names = list(self.city_names)
+        shm = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+        try:
+            np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)[:] = matrix
+            print(f"Esecuzione di {n_workers} ILS in parallelo ({max_iterations} iterazioni ciascuno)...")
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(_parallel_solve_worker, shm.name, matrix.shape, matrix.dtype.str, city_names,
+                                           start_city_index, max_iterations, time_budget, seed)
+                           for seed in seeds]
+                results = [future.result() for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+        # Tiene il percorso più corto, disponibile poi per i metodi di presentazione dei risultati
+        self.best_path_indices, self.best_distance = min(results, key=lambda result: result[1])
+        print(f"Distanza ottimale finale: {self.best_distance:.2f} km")
+        return self.best_path_indices, self.best_distance
+
+    def _nearest_neighbor(self, start_node_idx, kernels=_COMPILED_KERNELS):
         """
         Implementa l'algoritmo Nearest Neighbor per trovare un percorso TSP iniziale.
 
         Args:
             start_node_idx (int): L'indice del nodo (città) da cui iniziare.
+            kernels (types.SimpleNamespace, optional): Kernel da usare (vedi `solve`). Default alle versioni compilate.
 
         Returns:
             list: Un percorso (lista di indici di città) che inizia e finisce
                   al nodo di partenza, visitando ogni altra città una volta.
         """
-        unvisited_nodes = set(range(self.n_cities))
-        current_node = start_node_idx
-        path = [current_node]
-        unvisited_nodes.remove(current_node)
-
-        while unvisited_nodes:
-            # Trova il nodo non visitato più vicino al nodo corrente
-            next_node = min(unvisited_nodes, key=lambda node: self.distance_matrix[current_node][node])
-            path.append(next_node)
-            unvisited_nodes.remove(next_node)
-            current_node = next_node
+        path = kernels.nn_tour(self.distance_matrix, start_node_idx).tolist()
 
         # Completa il ciclo tornando al nodo di partenza
         path.append(start_node_idx)
         return path
 
-    def _iterated_local_search(self, initial_tour_indices, initial_distance, max_iterations):
+    def _iterated_local_search(self, initial_tour_indices, initial_distance, max_iterations, time_budget=None,
+                               kernels=_COMPILED_KERNELS):
         """
         Implementa l'algoritmo Iterated Local Search (ILS) per ottimizzare un percorso TSP.
 
+        Il percorso iniziale viene portato a un minimo locale (2-opt + Or-opt); a ogni iterazione
+        il minimo locale corrente viene perturbato con una o più mosse double-bridge e
+        riottimizzato. Dopo la perturbazione la ricerca locale riesamina soltanto le città
+        attorno agli archi modificati (don't-look bits).
+
+        Criterio di accettazione: un minimo locale migliore del corrente è sempre accettato;
+        uno peggiore lo è con probabilità `exp(-peggioramento / T)` (come nel simulated
+        annealing), con T pari a una piccola frazione della lunghezza media di un arco.
+        La forza della perturbazione (numero di double-bridge) è adattiva: torna a 1 a ogni
+        miglioramento e cresce, fino a `MAX_PERTURBATION_STRENGTH`, a ogni rifiuto.
+
+        Mantiene un insieme "elite" dei migliori minimi locali incontrati: periodicamente
+        la ricerca riparte (con una certa probabilità) da uno di essi invece che dal
+        percorso corrente, sfruttando il fatto che buone soluzioni tendono ad essere vicine tra loro.
+
+        Le iterazioni sono eseguite dal kernel compilato `_ils_iterations` a blocchi di
+        `ILS_BATCH_SIZE`: tra un blocco e l'altro vengono controllati il tempo disponibile
+        e stampati i progressi, senza tornare all'interprete a ogni iterazione.
+
         Args:
             initial_tour_indices (list): Il percorso iniziale (lista di indici di città),
                                          che include il ritorno alla partenza.
             initial_distance (float): La distanza del percorso iniziale.
             max_iterations (int): Numero massimo di iterazioni dell'ILS.
+            time_budget (float, optional): Tempo massimo in secondi. Default a None (nessun limite).
+            kernels (types.SimpleNamespace, optional): Kernel da usare (vedi `solve`). Default alle versioni compilate.
 
         Returns:
             tuple: Una tupla contenente (percorso_migliore_finale, distanza_migliore_finale).
         """
-        current_tour = initial_tour_indices[:-1] # Lavora con il percorso senza il ritorno finale duplicato
-        current_dist = initial_distance
+        # Lavora su array int32 senza il ritorno finale duplicato, modificati in-place dai kernel:
+        # nessuna conversione lista <-> array a ogni iterazione
+        current_tour = np.array(initial_tour_indices[:-1], dtype=np.int32)
+        start_city = initial_tour_indices[0] # Il 2-opt può spostarla dalla posizione 0 dell'array
+        _, current_dist = self._local_search(current_tour, initial_distance, kernels=kernels)
+
+        best_tour = current_tour.copy()
+        best_dist = current_dist
+        if current_dist < initial_distance:
+            print(f"Ricerca locale iniziale (2-opt + Or-opt): distanza {current_dist:.2f} km")
+
+        ILS_BATCH_SIZE = 32 # Iterazioni eseguite dal kernel tra due controlli del tempo
+        MAX_STAGNATION = 200 # Numero di iterazioni senza miglioramento globale prima di fermarsi
+        stagnation = 0
+        start_time = time.time()
+
+        ELITE_POOL_SIZE = 5 # Numero di minimi locali conservati
+        ELITE_RESTART_PROBABILITY = 0.5
+        elite_restart_interval = max(1, max_iterations // 10) # Ogni quante iterazioni valutare un riavvio
+        elite_tours = np.empty((ELITE_POOL_SIZE, self.n_cities), dtype=np.int32) # Un percorso (senza ritorno) per riga
+        elite_dists = np.full(ELITE_POOL_SIZE, np.inf) # inf = posto libero
+        elite_tours[0] = current_tour
+        elite_dists[0] = current_dist
+
+        MAX_PERTURBATION_STRENGTH = 5 # Numero massimo di double-bridge consecutive
+        ACCEPTANCE_TEMPERATURE_FACTOR = 0.01 # T in frazioni della lunghezza media di un arco
+        perturbation_strength = 1
+        temperature = max(ACCEPTANCE_TEMPERATURE_FACTOR * current_dist / self.n_cities, 1e-9) # Mai nulla (città coincidenti)
+
+        i = 0
+        while i < max_iterations:
+            if time_budget is not None and i > 0 and time.time() - start_time > time_budget:
+                print(f"Iterazione ILS {i+1}: Arresto per esaurimento del tempo disponibile ({time_budget:.1f} s).")
+                break
 
-        best_overall_tour = initial_tour_indices # Memorizza il percorso completo (con ritorno)
-        best_overall_dist = initial_distance
+            previous_best_dist = best_dist
+            # Il seme di ogni blocco viene da `random`, così `random.seed` rende ripetibile l'intera ricerca
+            current_dist, best_dist, perturbation_strength, stagnation, last_improvement, done = kernels.ils_iterations(
+                self.distance_matrix, self.neighbors, current_tour, current_dist, best_tour, best_dist,
+                elite_tours, elite_dists, i, min(ILS_BATCH_SIZE, max_iterations - i), elite_restart_interval,
+                ELITE_RESTART_PROBABILITY, temperature, perturbation_strength, MAX_PERTURBATION_STRENGTH,
+                stagnation, MAX_STAGNATION, random.getrandbits(31)
+            )
+            i += done
 
-        iterations_without_global_improvement = 0
-        MAX_STAGNATION = 200 # Numero di iterazioni senza miglioramento globale prima di fermarsi
+            if DEBUG_CHECK_LENGTHS:
+                assert abs(current_dist - self._calculate_tour_length(current_tour)) < 1e-3, "Lunghezza del percorso corrente non coerente"
+                assert abs(best_dist - self._calculate_tour_length(best_tour)) < 1e-3, "Lunghezza del miglior percorso non coerente"
 
-        for i in range(max_iterations):
-            # Ricerca Locale (es. 2-opt)
-            improved_in_local_search, new_tour_segment, new_dist_segment = self._local_search_2opt(current_tour, current_dist)
-
-            if new_dist_segment < current_dist:
-                current_tour = new_tour_segment
-                current_dist = new_dist_segment
-
-                if current_dist < best_overall_dist:
-                    best_overall_dist = current_dist
-                    best_overall_tour = current_tour + [current_tour[0]] # Aggiunge ritorno per coerenza
-                    iterations_without_global_improvement = 0
-                    print(f"Iterazione ILS {i+1}: Nuovo miglior percorso globale trovato, distanza: {best_overall_dist:.2f} km")
-                else:
-                    iterations_without_global_improvement += 1
-            else:
-                iterations_without_global_improvement += 1
-
-            # Perturbazione se la ricerca locale non migliora o per esplorare
-            # Applica la perturbazione se non c'è stato miglioramento o periodicamente
-            if not improved_in_local_search or (i % 50 == 0 and i > 0) : #  Condizione di perturbazione
-                if iterations_without_global_improvement > 20 : # Perturba se stagnante
-                    # print(f"Iterazione ILS {i+1}: Perturbazione del percorso...")
-                    current_tour = self._perturb_tour_double_bridge(current_tour)
-                    current_dist = self._calculate_path_length(current_tour + [current_tour[0]])
-
-
-            if iterations_without_global_improvement >= MAX_STAGNATION:
-                print(f"Iterazione ILS {i+1}: Arresto anticipato per stagnazione dopo {MAX_STAGNATION} iterazioni senza miglioramento globale.")
+            if best_dist < previous_best_dist:
+                print(f"Iterazione ILS {last_improvement+1}: Nuovo miglior percorso globale trovato, distanza: {best_dist:.2f} km")
+
+            if stagnation >= MAX_STAGNATION:
+                print(f"Iterazione ILS {i}: Arresto anticipato per stagnazione dopo {MAX_STAGNATION} iterazioni senza miglioramento globale.")
                 break
-        
-        if not best_overall_tour: # Assicura che ci sia sempre un percorso di ritorno
-             return initial_tour_indices, initial_distance
-        return best_overall_tour, best_overall_dist
+
+        return self._closed_path(best_tour, start_city), best_dist
 
 
-    def _local_search_2opt(self, tour_indices, current_distance):
+    def _closed_path(self, tour, start_city):
         """
-        Esegue una ricerca locale utilizzando la mossa 2-opt per migliorare il percorso.
-        Il percorso in input (`tour_indices`) non include il ritorno alla città di partenza.
+        Converte un tour (array senza ritorno, in qualsiasi rotazione) nel percorso
+        che parte dalla città indicata e vi ritorna.
 
         Args:
-            tour_indices (list): Il percorso attuale (lista di indici di città, senza ritorno alla partenza).
-            current_distance (float): La distanza del percorso attuale (calcolata includendo il ritorno).
+            tour (numpy.ndarray): Array `int32` di indici di città (senza ritorno alla partenza).
+            start_city (int): Indice della città di partenza.
 
         Returns:
-            tuple: (migliorato_bool, percorso_risultante, distanza_risultante)
-                   Il percorso e la distanza risultanti sono relativi al percorso che include il ritorno.
+            list: Il percorso come lista di indici, con il ritorno alla partenza.
         """
-        n = len(tour_indices)
-        best_tour_segment = list(tour_indices) # Copia del segmento di percorso (senza ritorno)
-        best_segment_distance = current_distance # Distanza completa del tour (con ritorno)
-        improved = False
+        shift = int(np.flatnonzero(tour == start_city)[0])
+        return np.roll(tour, -shift).tolist() + [start_city]
 
-        for i in range(n - 1): # da 0 a n-2
-            for j in range(i + 2, n): # da i+2 a n-1
-                # Escludere il caso in cui j sia l'ultimo nodo e i sia il primo,
-                # che chiuderebbe il cerchio in modo non standard per 2-opt su un segmento.
-                if i == 0 and j == n - 1: continue
-
-                # Costruisci il nuovo segmento invertendo la parte tra tour_indices[i+1] e tour_indices[j]
-                new_segment = list(tour_indices) # Crea una copia per la modifica
-                segment_to_reverse = new_segment[i+1 : j+1]
-                segment_to_reverse.reverse()
-                new_segment[i+1 : j+1] = segment_to_reverse
-
-                # Calcola la distanza del nuovo tour completo (aggiungendo il ritorno alla partenza)
-                new_total_distance = self._calculate_path_length(new_segment + [new_segment[0]])
-
-                if new_total_distance < best_segment_distance:
-                    best_segment_distance = new_total_distance
-                    best_tour_segment = new_segment
-                    improved = True
-                    # In una strategia "first improvement", si potrebbe uscire qui.
-                    # Qui adottiamo una strategia "best improvement" all'interno di questa chiamata 2-opt.
-
-        return improved, best_tour_segment, best_segment_distance
-
-
-    def _perturb_tour_double_bridge(self, tour_indices):
+    def _local_search(self, tour, current_distance, dont_look=None, kernels=_COMPILED_KERNELS):
         """
-        Applica una perturbazione "double-bridge" (una mossa 4-opt) al percorso.
-        Questa mossa aiuta ad uscire dai minimi locali.
-        Il percorso in input (`tour_indices`) non include il ritorno alla città di partenza.
+        Porta il percorso a un minimo locale sia per il 2-opt sia per l'Or-opt
+        (vedi `_alternating_local_search`), limitando le mosse candidate alle liste
+        dei vicini (`self.neighbors`).
+        Il percorso in input (`tour`) non include il ritorno alla città di partenza
+        e viene modificato in-place.
 
         Args:
-            tour_indices (list): Il percorso attuale (lista di indici di città, senza ritorno).
+            tour (numpy.ndarray): Il percorso attuale (array `int32` di indici di città, senza ritorno alla partenza).
+            current_distance (float): La distanza del percorso attuale (calcolata includendo il ritorno).
+            dont_look (numpy.ndarray, optional): Don't-look bits iniziali, indicizzate per città
+                                                 (True = città da non riesaminare). Default a None
+                                                 (tutte le città vengono esaminate).
+            kernels (types.SimpleNamespace, optional): Kernel da usare (vedi `solve`). Default alle versioni compilate.
 
         Returns:
-            list: Il nuovo percorso perturbato (lista di indici di città, senza ritorno).
+            tuple: (migliorato_bool, distanza_risultante)
         """
-        n = len(tour_indices)
-        if n < 4: # La mossa double-bridge richiede almeno 4 città nel segmento
-            return list(tour_indices)
-
-        # Scegli 4 punti di taglio casuali, distinti e ordinati
-        # i < j < k < l
-        # Gli archi da rompere sono (p_i, p_{i+1}), (p_j, p_{j+1}), (p_k, p_{k+1}), (p_l, p_{l+1})
-        # In questo caso, consideriamo indici di *nodi* per suddividere il percorso.
-        # Seleziona 4 indici casuali per i nodi che definiranno i segmenti.
-        # Assicurati che gli indici siano distinti e che ci sia spazio tra loro.
-        idx = sorted(random.sample(range(n), 4))
-
-        i, j, k, l = idx[0], idx[1], idx[2], idx[3]
-
-        # Ricostruisci il percorso scambiando i segmenti intermedi
-        # Segmento 1: da inizio a tour_indices[i]
-        # Segmento 2: da tour_indices[i+1] a tour_indices[j]
-        # Segmento 3: da tour_indices[j+1] a tour_indices[k]
-        # Segmento 4: da tour_indices[k+1] a tour_indices[l]
-        # Segmento 5: da tour_indices[l+1] a fine
-        # La mossa double-bridge standard ricombina come: seg1 -> seg4 -> seg3 -> seg2 -> seg5 (adattato)
-        # A B C D -> A D C B (2-opt)
-        # tour = P_0 ... P_i | P_{i+1} ... P_j | P_{j+1} ... P_k | P_{k+1} ... P_l | P_{l+1} ... P_{n-1}
-        # new_tour = P_0 ... P_i + P_{k+1} ... P_l + P_{j+1} ... P_k + P_{i+1} ... P_j + P_{l+1} ... P_{n-1}
-
-        s1 = tour_indices[0 : i+1]
-        s2 = tour_indices[i+1 : j+1]
-        s3 = tour_indices[j+1 : k+1]
-        s4 = tour_indices[k+1 : l+1]
-        s5 = tour_indices[l+1 : n]
-        
-        # Una possibile ricombinazione double-bridge:
-        perturbed_tour = s1 + s4 + s3 + s2 + s5
-        
-        # Verifica la validità del percorso perturbato (lunghezza e unicità dei nodi)
-        if len(perturbed_tour) == n and len(set(perturbed_tour)) == n:
-            return perturbed_tour
-        else: # Se la perturbazione fallisce (raro con indici corretti), ritorna l'originale
-            return list(tour_indices)
+        if dont_look is None:
+            dont_look = np.zeros(self.n_cities, dtype=np.bool_)
+        return kernels.alternating_local_search(self.distance_matrix, self.neighbors, tour, current_distance, dont_look)
 
 
     def _calculate_path_length(self, path_indices):
@@ -284,15 +417,25 @@ class TSPSolver:
         Returns:
             float: La lunghezza totale del percorso.
         """
-        total_distance = 0.0
-        if not path_indices or len(path_indices) < 2:
+        if path_indices is None or len(path_indices) < 2:
             return 0.0 # Nessuna distanza se il percorso è vuoto o ha un solo nodo
 
-        for i in range(len(path_indices) - 1):
-            from_node = path_indices[i]
-            to_node = path_indices[i+1]
-            total_distance += self.distance_matrix[from_node][to_node]
-        return total_distance
+        return _path_length(self.distance_matrix, np.asarray(path_indices, dtype=np.int32))
+
+    def _calculate_tour_length(self, tour):
+        """
+        Calcola la lunghezza del tour chiuso descritto da un array senza ritorno alla partenza.
+
+        Equivale a `_calculate_path_length` sul percorso con il ritorno aggiunto, ma
+        somma l'arco di chiusura a parte invece di allocare una copia del percorso.
+
+        Args:
+            tour (numpy.ndarray): Array `int32` di indici di città (senza ritorno alla partenza).
+
+        Returns:
+            float: La lunghezza del tour, incluso il ritorno alla città di partenza.
+        """
+        return _path_length(self.distance_matrix, tour) + float(self.distance_matrix[tour[-1], tour[0]])
 
     def get_path_with_names(self):
         """
@@ -319,14 +462,8 @@ class TSPSolver:
         if self.best_path_indices is None or len(self.best_path_indices) < 2:
             return []
 
-        details = []
-        for i in range(len(self.best_path_indices) - 1):
-            from_idx = self.best_path_indices[i]
-            to_idx = self.best_path_indices[i+1]
-            distance = self.distance_matrix[from_idx][to_idx]
-            details.append((
-                self.city_names[from_idx],
-                self.city_names[to_idx],
-                distance
-            ))
-        return details
\ No newline at end of file
+        # Legge le distanze di tutte le tratte con un'unica indicizzazione vettoriale
+        path = np.asarray(self.best_path_indices)
+        distances = self.distance_matrix[path[:-1], path[1:]].tolist()
+        names = self.get_path_with_names()
+        return list(zip(names[:-1], names[1:], distances))
\ No newline at end of file
@@ -0,0 +1,635 @@
+"""
+Kernel compilati con Numba per le parti computazionalmente più onerose del TSPSolver.
+
+Le funzioni di questo modulo lavorano direttamente sulla matrice delle distanze
+(numpy.ndarray float32 contiguo) e su percorsi rappresentati come array
+di interi `int32`, senza oggetti Python nel ciclo interno. Sono pensate per essere chiamate da
+`TSPSolver` (src/NN_ILS.py) e non fanno parte dell'interfaccia pubblica.
+
+I kernel sono compilati con `nogil=True`: durante la loro esecuzione il GIL viene
+rilasciato, così un server WSGI multi-thread può risolvere più richieste in parallelo.
+"""
+
+import numpy as np
+from numba import njit, types
+
+
+@njit(cache=True, nogil=True, boundscheck=False)
+def _nn_tour(D, start):
+    """
+    Costruisce un percorso con l'algoritmo Nearest Neighbor.
+
+    A ogni passo la riga della città corrente viene copiata in un buffer riutilizzato,
+    le città già visitate sono mascherate con `inf` e la successiva è scelta con
+    `argmin`: anche la versione Python pura (`py_func`) esegue solo N riduzioni
+    vettoriali NumPy, senza un ciclo Python sulle città.
+    (Compilato senza fastmath, che non garantisce il corretto trattamento di `inf`.)
+
+    Args:
+        D (numpy.ndarray): Matrice N x N delle distanze.
+        start (int): Indice della città di partenza.
+
+    Returns:
+        numpy.ndarray: Array `int32` di N indici di città (senza ritorno alla partenza).
+    """
+    n = D.shape[0]
+    tour = np.empty(n, dtype=np.int32)
+    visited = np.zeros(n, dtype=np.bool_)
+
+    row = np.empty_like(D[0]) # Buffer per la riga mascherata, allocato una sola volta
+
+    tour[0] = start
+    visited[start] = True
+    current = start
+
+    for k in range(1, n):
+        # Trova il nodo non visitato più vicino al nodo corrente
+        row[:] = D[current]
+        row[visited] = np.inf
+        next_node = np.argmin(row)
+        tour[k] = next_node
+        visited[next_node] = True
+        current = next_node
+
+    return tour
+
+
+@njit(cache=True, fastmath=True, nogil=True, boundscheck=False)
+def _two_opt_local_search(D, neighbors, tour, length, dont_look, reopen):
+    """
+    Applica mosse 2-opt fino a raggiungere un minimo locale.
+
+    Per ogni città vengono considerate come candidate solo le sue città più vicine
+    (`neighbors`), ordinate per distanza: appena il nuovo arco verso la candidata è
+    più lungo dell'arco che si vorrebbe rimuovere, nessuna candidata successiva può
+    dare un miglioramento e la scansione si interrompe. Il ciclo interno è quindi
+    O(K) invece di O(N).
+
+    Ogni mossa è valutata in O(1) con la formula delta
+    `D[a,c] + D[b,d] - D[a,b] - D[c,d]`; tra le candidate di una città viene applicata
+    la migliore. Il ciclo interno aggiorna la migliore con espressioni condizionali
+    invece di un salto (LLVM le traduce in `cmov`): l'esito del confronto è quasi
+    casuale e un salto sarebbe spesso mal predetto dalla CPU. Il percorso è
+    un ciclo: invertire il tratto tra i due archi o il tratto complementare produce
+    lo stesso tour (percorso nell'altro verso), quindi viene invertito il più corto
+    dei due, con al più N/2 scambi. Per questo la città di partenza può non restare
+    in posizione 0: il chiamante ruota il percorso quando ne ha bisogno.
+    Le "don't-look bits" evitano di riesaminare le città attorno alle quali non è
+    stato trovato alcun miglioramento: il bit di una città viene azzerato solo
+    quando uno dei suoi archi cambia.
+    I delta sono calcolati in float64 (`np.float64`: in Numba `float()` di un valore
+    float32 resta float32): con gli arrotondamenti del float32 mosse a guadagno nullo
+    potrebbero sembrare migliorative e la ricerca ciclerebbe all'infinito.
+
+    Args:
+        D (numpy.ndarray): Matrice N x N delle distanze.
+        neighbors (numpy.ndarray): Matrice `int32` N x K; la riga `i` contiene le K città
+                                   più vicine a `i`, in ordine di distanza crescente.
+        tour (numpy.ndarray): Array `int32` del percorso (senza ritorno alla partenza).
+                              Viene modificato in-place.
+        length (float): Lunghezza attuale del tour chiuso.
+        dont_look (numpy.ndarray): Array booleano di N elementi, indicizzato per città
+                                   (True = città da non riesaminare). Viene modificato in-place.
+        reopen (numpy.ndarray): Don't-look bits di un'altra ricerca locale (es. Or-opt) da
+                                azzerare per le città coinvolte in ogni mossa; può essere
+                                lo stesso array `dont_look`.
+
+    Returns:
+        tuple: (migliorato, lunghezza_del_tour_chiuso)
+    """
+    n = tour.shape[0]
+    n_neighbors = neighbors.shape[1]
+    pos = np.empty(n, dtype=np.int32) # Posizione di ogni città nel percorso
+    for k in range(n):
+        pos[tour[k]] = k
+
+    improved = False
+    active = True
+    while active:
+        active = False
+        for city in range(n):
+            if dont_look[city]:
+                continue
+            # Soglia per ignorare "miglioramenti" dovuti solo ad arrotondamenti
+            best_delta = -1e-10
+            best_a_pos = -1
+            best_c_pos = -1
+            # Prova entrambi gli archi della città: verso il successore e dal predecessore.
+            # La mossa sostituisce gli archi (a,b) e (c,d) con (a,c) e (b,d): nel primo caso
+            # `city` è `a` e la candidata è `c`, nel secondo `city` è `b` e la candidata è `d`
+            for direction in range(2):
+                a_pos = pos[city] if direction == 0 else (pos[city] - 1 + n) % n
+                a = tour[a_pos]
+                b = tour[(a_pos + 1) % n]
+                removed = D[a, b] # Arco della città che la mossa eliminerebbe
+                for k in range(n_neighbors):
+                    candidate = neighbors[city, k]
+                    if D[city, candidate] >= removed:
+                        break # Candidate ordinate per distanza: nessuna delle successive può migliorare
+                    c_pos = pos[candidate] if direction == 0 else (pos[candidate] - 1 + n) % n
+                    # Esclude lo stesso arco e gli archi adiacenti (che condividono una città)
+                    if c_pos == a_pos or c_pos == (a_pos + 1) % n or (c_pos + 1) % n == a_pos:
+                        continue
+                    c = tour[c_pos]
+                    d = tour[(c_pos + 1) % n]
+                    delta = np.float64(D[a, c]) + np.float64(D[b, d]) - np.float64(D[a, b]) - np.float64(D[c, d])
+                    better = delta < best_delta
+                    best_delta = delta if better else best_delta
+                    best_a_pos = a_pos if better else best_a_pos
+                    best_c_pos = c_pos if better else best_c_pos
+
+            if best_a_pos < 0:
+                dont_look[city] = True
+                continue
+
+            a_pos, c_pos = best_a_pos, best_c_pos
+            a, b = tour[a_pos], tour[(a_pos + 1) % n]
+            c, d = tour[c_pos], tour[(c_pos + 1) % n]
+            # Inverte il tratto compreso tra i due archi, o il complementare (che
+            # attraversa la fine dell'array) se più corto, con scambi in-place
+            # che aggiornano insieme le posizioni (nessuna copia temporanea)
+            lo = min(a_pos, c_pos) + 1
+            hi = max(a_pos, c_pos)
+            inner = hi - lo + 1
+            if 2 * inner > n:
+                lo, hi = hi + 1, lo - 1 + n # Estremi del complementare, con hi oltre la fine
+            for _ in range(min(inner, n - inner) // 2):
+                i, j = lo % n, hi % n
+                tour[i], tour[j] = tour[j], tour[i]
+                pos[tour[i]] = i
+                pos[tour[j]] = j
+                lo += 1
+                hi -= 1
+            length += best_delta
+            dont_look[a] = dont_look[b] = dont_look[c] = dont_look[d] = False
+            reopen[a] = reopen[b] = reopen[c] = reopen[d] = False
+            improved = True
+            active = True
+
+    return improved, length
+
+
+@njit(cache=True, fastmath=True, nogil=True, boundscheck=False)
+def _or_opt_local_search(D, neighbors, tour, length, dont_look, reopen):
+    """
+    Applica mosse Or-opt "first improvement" fino a raggiungere un minimo locale.
+
+    Una mossa Or-opt sposta un segmento di 1, 2 o 3 città consecutive (eventualmente
+    invertendolo) tra altre due città adiacenti del percorso. Il segmento viene
+    reinserito accanto a una delle città più vicine (`neighbors`) a una delle sue
+    estremità; la scansione delle candidate si interrompe appena il nuovo arco è più
+    lungo del guadagno ottenuto rimuovendo il segmento. Come nel 2-opt, le
+    don't-look bits limitano la ricerca alle città attorno agli archi modificati e
+    la città in posizione 0 dell'array non fa mai parte del segmento spostato.
+    Anche qui i delta sono calcolati in float64 (vedi `_two_opt_local_search`).
+
+    Args:
+        D (numpy.ndarray): Matrice N x N delle distanze.
+        neighbors (numpy.ndarray): Matrice `int32` N x K delle città più vicine a ogni città.
+        tour (numpy.ndarray): Array `int32` del percorso (senza ritorno alla partenza).
+                              Viene modificato in-place.
+        length (float): Lunghezza attuale del tour chiuso.
+        dont_look (numpy.ndarray): Don't-look bits della ricerca Or-opt. Viene modificato in-place.
+        reopen (numpy.ndarray): Don't-look bits di un'altra ricerca locale (es. 2-opt) da
+                                azzerare per le città coinvolte in ogni mossa; può essere
+                                lo stesso array `dont_look`.
+
+    Returns:
+        tuple: (migliorato, lunghezza_del_tour_chiuso)
+    """
+    n = tour.shape[0]
+    n_neighbors = neighbors.shape[1]
+    pos = np.empty(n, dtype=np.int32) # Posizione di ogni città nel percorso
+    for k in range(n):
+        pos[tour[k]] = k
+    segment = np.empty(3, dtype=np.int32)
+
+    improved = False
+    active = True
+    while active:
+        active = False
+        for city in range(n):
+            if dont_look[city]:
+                continue
+            found = False
+            p = pos[city]
+            for seg_len in range(1, 4):
+                # Segmento tour[p : p + seg_len], che non contiene mai la posizione 0
+                if p == 0 or p + seg_len > n:
+                    break
+                prev = tour[p - 1]
+                s1 = tour[p]
+                s2 = tour[p + seg_len - 1]
+                nxt = tour[(p + seg_len) % n]
+                gain = np.float64(D[prev, s1]) + np.float64(D[s2, nxt]) - np.float64(D[prev, nxt]) # Guadagno della rimozione
+                if gain <= 1e-10:
+                    continue
+                # Il segmento viene inserito tra x = tour[q] e y = tour[q+1], con una delle
+                # sue estremità adiacente a una città vicina
+                for end in range(2):
+                    end_city = s1 if end == 0 else s2
+                    for k in range(n_neighbors):
+                        candidate = neighbors[end_city, k]
+                        if D[end_city, candidate] >= gain:
+                            break # Candidate ordinate per distanza: nessuna delle successive può migliorare
+                        for side in range(2):
+                            q = pos[candidate] if side == 0 else (pos[candidate] - 1 + n) % n
+                            if p - 1 <= q <= p + seg_len - 1:
+                                continue # Arco di inserimento interno o adiacente al segmento
+                            x = tour[q]
+                            y = tour[(q + 1) % n]
+                            reverse = end != side # Orientamento che rende `end_city` adiacente alla candidata
+                            if reverse:
+                                added = np.float64(D[x, s2]) + np.float64(D[s1, y]) - np.float64(D[x, y])
+                            else:
+                                added = np.float64(D[x, s1]) + np.float64(D[s2, y]) - np.float64(D[x, y])
+                            delta = added - gain
+                            if delta < -1e-10:
+                                for m in range(seg_len):
+                                    segment[m] = tour[p + seg_len - 1 - m] if reverse else tour[p + m]
+                                if q > p:
+                                    # Inserimento dopo il segmento: il tratto intermedio scorre indietro
+                                    for m in range(p, q - seg_len + 1):
+                                        tour[m] = tour[m + seg_len]
+                                    start = q - seg_len + 1
+                                    lo, hi = p, q
+                                else:
+                                    # Inserimento prima del segmento: il tratto intermedio scorre in avanti
+                                    for m in range(p - 1, q, -1):
+                                        tour[m + seg_len] = tour[m]
+                                    start = q + 1
+                                    lo, hi = q + 1, p + seg_len - 1
+                                for m in range(seg_len):
+                                    tour[start + m] = segment[m]
+                                for m in range(lo, hi + 1):
+                                    pos[tour[m]] = m
+                                length += delta
+                                for c in (prev, nxt, s1, s2, x, y):
+                                    dont_look[c] = False
+                                    reopen[c] = False
+                                found = True
+                                improved = True
+                                active = True
+                                break
+                        if found:
+                            break
+                    if found:
+                        break
+                if found:
+                    break
+            if not found:
+                dont_look[city] = True
+
+    return improved, length
+
+
+@njit(cache=True, nogil=True)
+def _alternating_local_search(D, neighbors, tour, length, dont_look):
+    """
+    Porta il percorso a un minimo locale sia per il 2-opt sia per l'Or-opt.
+
+    Le due ricerche si alternano finché l'Or-opt non trova più miglioramenti
+    (il 2-opt termina sempre in un proprio minimo locale). Ciascuna ha le proprie
+    don't-look bits, e ogni mossa riapre nell'altra le città coinvolte.
+
+    Args:
+        D (numpy.ndarray): Matrice N x N delle distanze.
+        neighbors (numpy.ndarray): Matrice `int32` N x K delle città più vicine a ogni città.
+        tour (numpy.ndarray): Array `int32` del percorso (senza ritorno alla partenza).
+                              Viene modificato in-place.
+        length (float): Lunghezza attuale del tour chiuso.
+        dont_look (numpy.ndarray): Don't-look bits iniziali (True = città da non riesaminare).
+                                   Viene modificato in-place.
+
+    Returns:
+        tuple: (migliorato, lunghezza_del_tour_chiuso)
+    """
+    or_opt_dont_look = dont_look.copy()
+    improved = False
+    while True:
+        improved_2opt, length = _two_opt_local_search(D, neighbors, tour, length, dont_look, or_opt_dont_look)
+        improved_or_opt, length = _or_opt_local_search(D, neighbors, tour, length, or_opt_dont_look, dont_look)
+        improved = improved or improved_2opt or improved_or_opt
+        if not improved_or_opt:
+            return improved, length
+
+
+@njit(cache=True, fastmath=True, nogil=True, boundscheck=False)
+def _double_bridge(D, tour, out, dont_look):
+    """
+    Applica una perturbazione "double-bridge" (una mossa 4-opt) al percorso.
+
+    Con 4 punti di taglio casuali i < j < k < l il percorso
+    `P_0..P_i | P_i+1..P_j | P_j+1..P_k | P_k+1..P_l | P_l+1..P_n-1` diventa
+    `P_0..P_i | P_k+1..P_l | P_j+1..P_k | P_i+1..P_j | P_l+1..P_n-1`: i segmenti sono
+    riordinati senza essere invertiti, e la variazione di lunghezza si calcola in O(1)
+    sui 4 archi rimossi e i 4 aggiunti. Le città agli estremi degli archi modificati
+    vengono segnate come da riesaminare nelle don't-look bits.
+
+    Args:
+        D (numpy.ndarray): Matrice N x N delle distanze.
+        tour (numpy.ndarray): Array `int32` del percorso (senza ritorno alla partenza).
+        out (numpy.ndarray): Array `int32` di N elementi, distinto da `tour`, in cui
+                             scrivere il percorso perturbato.
+        dont_look (numpy.ndarray): Don't-look bits da aggiornare in-place.
+
+    Returns:
+        float: La variazione di lunghezza del tour chiuso.
+    """
+    n = tour.shape[0]
+    if n < 4: # La mossa double-bridge richiede almeno 4 città
+        out[:] = tour
+        return 0.0
+
+    # 4 punti di taglio casuali e distinti, poi ordinati
+    cuts = np.empty(4, dtype=np.int64)
+    count = 0
+    while count < 4:
+        cut = np.random.randint(0, n)
+        duplicate = False
+        for m in range(count):
+            if cuts[m] == cut:
+                duplicate = True
+        if not duplicate:
+            cuts[count] = cut
+            count += 1
+    cuts.sort()
+    i, j, k, l = cuts[0], cuts[1], cuts[2], cuts[3]
+
+    # Gli archi (a,a1), (b,b1), (c,c1), (d,d1) vengono sostituiti da (a,c1), (d,b1), (c,a1), (b,d1)
+    a, a1, b, b1 = tour[i], tour[i + 1], tour[j], tour[j + 1]
+    c, c1, d, d1 = tour[k], tour[k + 1], tour[l], tour[(l + 1) % n] # Con l = n-1 l'ultimo arco è quello di chiusura
+    delta = (np.float64(D[a, c1]) + np.float64(D[d, b1]) + np.float64(D[c, a1]) + np.float64(D[b, d1])
+             - np.float64(D[a, a1]) - np.float64(D[b, b1]) - np.float64(D[c, c1]) - np.float64(D[d, d1]))
+    for city in (a, a1, b, b1, c, c1, d, d1):
+        dont_look[city] = False
+
+    out[: i + 1] = tour[: i + 1]
+    p = i + 1
+    out[p : p + l - k] = tour[k + 1 : l + 1]
+    p += l - k
+    out[p : p + k - j] = tour[j + 1 : k + 1]
+    p += k - j
+    out[p : p + j - i] = tour[i + 1 : j + 1]
+    out[l + 1 :] = tour[l + 1 :]
+    return delta
+
+
+@njit(cache=True, nogil=True)
+def _seed_numba_rng(seed):
+    """
+    Inizializza il generatore casuale di Numba (distinto da quello globale di NumPy).
+
+    Args:
+        seed (int): Il seme.
+    """
+    np.random.seed(seed)
+
+
+@njit(cache=True, nogil=True, boundscheck=False)
+def _ils_iterations(D, neighbors, current, current_dist, best, best_dist, elite_tours, elite_dists,
+                    first_iteration, n_iterations, restart_interval, restart_probability,
+                    temperature, strength, max_strength, stagnation, max_stagnation, seed):
+    """
+    Esegue un blocco di iterazioni dell'Iterated Local Search interamente in codice compilato.
+
+    A ogni iterazione: eventuale ripartenza da un minimo locale dell'elite, perturbazione
+    con `strength` mosse double-bridge, ricerca locale (2-opt + Or-opt) limitata alle
+    città attorno agli archi modificati e criterio di accettazione (sempre se migliore,
+    altrimenti con probabilità `exp(-peggioramento / temperature)`). La forza della
+    perturbazione torna a 1 a ogni miglioramento e cresce fino a `max_strength` a ogni
+    rifiuto. Lo stato della ricerca vive negli array passati come argomenti, così il
+    chiamante può proseguire con un nuovo blocco (ad esempio dopo aver controllato il tempo).
+    (Compilato senza fastmath, che non garantisce il corretto trattamento di `inf`,
+    usato per i posti vuoti dell'elite.)
+
+    Args:
+        D (numpy.ndarray): Matrice N x N delle distanze.
+        neighbors (numpy.ndarray): Matrice `int32` N x K delle città più vicine a ogni città.
+        current (numpy.ndarray): Percorso corrente (`int32`, senza ritorno). Modificato in-place.
+        current_dist (float): Lunghezza del percorso corrente.
+        best (numpy.ndarray): Miglior percorso trovato (`int32`, senza ritorno). Modificato in-place.
+        best_dist (float): Lunghezza del miglior percorso.
+        elite_tours (numpy.ndarray): Matrice `int32` E x N dei minimi locali dell'elite. Modificata in-place.
+        elite_dists (numpy.ndarray): Lunghezze dei minimi dell'elite (`inf` = posto vuoto). Modificato in-place.
+        first_iteration (int): Indice globale della prima iterazione del blocco.
+        n_iterations (int): Numero di iterazioni da eseguire.
+        restart_interval (int): Ogni quante iterazioni valutare una ripartenza dall'elite.
+        restart_probability (float): Probabilità della ripartenza.
+        temperature (float): Temperatura del criterio di accettazione (mai nulla).
+        strength (int): Forza attuale della perturbazione.
+        max_strength (int): Forza massima della perturbazione.
+        stagnation (int): Iterazioni consecutive senza miglioramento globale.
+        max_stagnation (int): Soglia di stagnazione oltre la quale il blocco si interrompe.
+        seed (int): Seme del generatore casuale usato nel blocco.
+
+    Returns:
+        tuple: (current_dist, best_dist, strength, stagnation, ultima_iterazione_migliorativa,
+                iterazioni_eseguite). L'ultima iterazione migliorativa è -1 se il miglior
+                percorso non è cambiato.
+    """
+    # Nel codice compilato np.random è il generatore di Numba; eseguendo `py_func` è quello
+    # globale di NumPy, mentre i kernel chiamati qui dentro (es. `_double_bridge`) restano
+    # compilati e usano quello di Numba: vengono inizializzati entrambi
+    np.random.seed(seed)
+    _seed_numba_rng(seed)
+    n = current.shape[0]
+    n_elite = elite_dists.shape[0]
+    candidate = np.empty_like(current)
+    scratch = np.empty_like(current)
+    dont_look = np.empty(n, dtype=np.bool_)
+    last_improvement = -1
+
+    done = 0
+    while done < n_iterations:
+        iteration = first_iteration + done
+        done += 1
+
+        # Riparte periodicamente da un minimo locale dell'elite scelto a caso
+        filled = 0
+        for e in range(n_elite):
+            if elite_dists[e] < np.inf:
+                filled += 1
+        if iteration > 0 and iteration % restart_interval == 0 and filled > 1 and np.random.random() < restart_probability:
+            chosen = np.random.randint(0, filled)
+            for e in range(n_elite):
+                if elite_dists[e] < np.inf:
+                    if chosen == 0:
+                        current[:] = elite_tours[e]
+                        current_dist = elite_dists[e]
+                        break
+                    chosen -= 1
+
+        # Perturbazione del minimo locale corrente e nuova ricerca locale sul risultato;
+        # le mosse consecutive alternano due buffer (non possono scrivere sull'array che leggono)
+        dont_look[:] = True
+        candidate_dist = current_dist + _double_bridge(D, current, candidate, dont_look)
+        for _ in range(strength - 1):
+            candidate_dist += _double_bridge(D, candidate, scratch, dont_look)
+            candidate, scratch = scratch, candidate
+        _, candidate_dist = _alternating_local_search(D, neighbors, candidate, candidate_dist, dont_look)
+
+        # Criterio di accettazione
+        worsening = candidate_dist - current_dist
+        if worsening < -1e-9:
+            strength = 1 # Miglioramento: si torna alla perturbazione minima
+            accepted = True
+        else:
+            strength = min(strength + 1, max_strength)
+            accepted = worsening > 1e-9 and np.random.random() < np.exp(-worsening / temperature)
+
+        if accepted:
+            current[:] = candidate
+            current_dist = candidate_dist
+
+            # Un nuovo minimo locale entra nell'elite (al posto del peggiore) se è tra i
+            # migliori trovati e non è già presente
+            worst = 0
+            present = False
+            for e in range(n_elite):
+                if abs(elite_dists[e] - current_dist) <= 1e-9:
+                    present = True
+                if elite_dists[e] > elite_dists[worst]:
+                    worst = e
+            if not present and current_dist < elite_dists[worst]:
+                elite_tours[worst] = current
+                elite_dists[worst] = current_dist
+
+        if current_dist < best_dist - 1e-9:
+            best[:] = current
+            best_dist = current_dist
+            stagnation = 0
+            last_improvement = iteration
+        else:
+            stagnation += 1
+            if stagnation >= max_stagnation:
+                break
+
+    return current_dist, best_dist, strength, stagnation, last_improvement, done
+
+
+@njit(cache=True, nogil=True, boundscheck=False)
+def _held_karp(D, start):
+    """
+    Risolve il TSP in modo esatto con la programmazione dinamica di Held-Karp.
+
+    `dp[mask, j]` è il costo minimo per partire da `start`, visitare esattamente
+    le città dell'insieme `mask` e terminare nella città `j` (appartenente a `mask`).
+    Complessità O(N^2 * 2^N) in tempo e O(N * 2^N) in memoria: adatto solo a N piccoli.
+    (Compilato senza fastmath, che non garantisce il corretto trattamento di `inf`.)
+
+    Args:
+        D (numpy.ndarray): Matrice N x N delle distanze (N >= 2).
+        start (int): Indice della città di partenza.
+
+    Returns:
+        tuple: (percorso_ottimo, lunghezza_del_tour_chiuso), con il percorso come
+               array `int32` di N indici (senza ritorno alla partenza).
+    """
+    n = D.shape[0]
+    m = n - 1 # Città diverse dalla partenza, rappresentate dai bit di `mask`
+    others = np.empty(m, dtype=np.int32)
+    k = 0
+    for v in range(n):
+        if v != start:
+            others[k] = v
+            k += 1
+
+    full = 1 << m
+    dp = np.full((full, m), np.inf)
+    parent = np.full((full, m), -1, dtype=np.int32)
+    for j in range(m):
+        dp[1 << j, j] = D[start, others[j]]
+
+    for mask in range(1, full):
+        for j in range(m):
+            if not (mask >> j) & 1:
+                continue
+            cost = dp[mask, j]
+            if cost == np.inf:
+                continue
+            for k in range(m):
+                if (mask >> k) & 1:
+                    continue
+                next_mask = mask | (1 << k)
+                candidate = cost + D[others[j], others[k]]
+                if candidate < dp[next_mask, k]:
+                    dp[next_mask, k] = candidate
+                    parent[next_mask, k] = j
+
+    # Chiude il ciclo tornando alla partenza
+    best = np.inf
+    last = 0
+    for j in range(m):
+        candidate = dp[full - 1, j] + D[others[j], start]
+        if candidate < best:
+            best = candidate
+            last = j
+
+    # Ricostruisce il percorso a ritroso seguendo i predecessori
+    tour = np.empty(n, dtype=np.int32)
+    tour[0] = start
+    mask = full - 1
+    j = last
+    for pos in range(n - 1, 0, -1):
+        tour[pos] = others[j]
+        previous = parent[mask, j]
+        mask ^= 1 << j
+        j = previous
+    return tour, best
+
+
+# Firme di `_path_length`: matrice float32 C-contigua scrivibile o di sola lettura
+# (la web app la carica con np.load in mmap_mode='r'), percorso int32 contiguo
+_PATH_LENGTH_SIGNATURES = [
+    types.float64(types.Array(types.float32, 2, 'C', readonly=readonly), types.Array(types.int32, 1, 'C'))
+    for readonly in (False, True)
+]
+
+@njit(_PATH_LENGTH_SIGNATURES, cache=True, fastmath=True, nogil=True, boundscheck=False)
+def _path_length(D, path):
+    """
+    Somma le distanze tra le città consecutive di un percorso.
+
+    Compilato in anticipo per le sole firme usate da TSPSolver (matrice float32
+    contigua, percorso int32): nessuna specializzazione al primo utilizzo, e con
+    fastmath LLVM può riordinare la somma per vettorizzarla. La somma è in float64
+    per non accumulare errori di arrotondamento del float32.
+
+    Args:
+        D (numpy.ndarray): Matrice N x N `float32` delle distanze (C-contigua).
+        path (numpy.ndarray): Array `int32` di indici di città.
+
+    Returns:
+        float: La lunghezza del percorso.
+    """
+    total = 0.0
+    for k in range(path.shape[0] - 1):
+        total += np.float64(D[path[k], path[k + 1]])
+    return total
+
+
+def warmup():
+    """
+    Precompila i kernel con una matrice fittizia 4x4, così il costo della
+    compilazione JIT (o della lettura della cache su disco) non ricade sulla
+    prima risoluzione reale.
+
+    Ogni kernel viene compilato sia per una matrice scrivibile sia per una di sola
+    lettura: per Numba sono tipi diversi, e la web app carica le matrici salvate
+    con np.load in mmap_mode='r'.
+    """
+    writable = np.zeros((4, 4), dtype=np.float32) # Stesso tipo della matrice usata da TSPSolver
+    read_only = writable.copy()
+    read_only.setflags(write=False)
+    for D in (writable, read_only):
+        _nn_tour(D, 0)
+        dont_look = np.zeros(4, dtype=np.bool_)
+        _two_opt_local_search(D, np.zeros((4, 3), dtype=np.int32), np.arange(4, dtype=np.int32), 0.0, dont_look, dont_look)
+        _or_opt_local_search(D, np.zeros((4, 3), dtype=np.int32), np.arange(4, dtype=np.int32), 0.0, dont_look, dont_look)
+        _alternating_local_search(D, np.zeros((4, 3), dtype=np.int32), np.arange(4, dtype=np.int32), 0.0, dont_look)
+        _ils_iterations(D, np.zeros((4, 3), dtype=np.int32), np.arange(4, dtype=np.int32), 0.0,
+                        np.arange(4, dtype=np.int32), 0.0, np.zeros((2, 4), dtype=np.int32),
+                        np.full(2, np.inf), 0, 1, 1, 0.5, 1e-9, 1, 5, 0, 200, 0)
+        _held_karp(D, 0)
+        _path_length(D, np.arange(4, dtype=np.int32))
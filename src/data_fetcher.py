@@ -1,6 +1,52 @@
 import os
-import json
+import orjson
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+def cities_to_arrays(cities):
+    """
+    Converte una lista di dizionari città in array NumPy paralleli (struttura di array).
+
+    Args:
+        cities (list): Lista di dizionari con le chiavi 'name', 'lat', 'lon' e 'population'.
+
+    Returns:
+        dict: Un dizionario {'name', 'lat', 'lon', 'population'} di numpy.ndarray.
+    """
+    n = len(cities)
+    return {
+        'name': np.array([c['name'] for c in cities]),
+        'lat': np.fromiter((c['lat'] for c in cities), dtype=np.float64, count=n),
+        'lon': np.fromiter((c['lon'] for c in cities), dtype=np.float64, count=n),
+        'population': np.fromiter((c.get('population', 0) for c in cities), dtype=np.float64, count=n),
+    }
+
+# Mappatura dei codici regione ai nomi completi delle regioni italiane (costante di modulo,
+# consultabile senza creare un fetcher e la relativa sessione HTTP)
+REGIONS = {
+    "abruzzo": "Abruzzo",
+    "basilicata": "Basilicata",
+    "calabria": "Calabria",
+    "campania": "Campania",
+    "emilia-romagna": "Emilia-Romagna",
+    "friuli-venezia-giulia": "Friuli-Venezia Giulia",
+    "lazio": "Lazio",
+    "liguria": "Liguria",
+    "lombardia": "Lombardia",
+    "marche": "Marche",
+    "molise": "Molise",
+    "piemonte": "Piemonte",
+    "puglia": "Puglia",
+    "sardegna": "Sardegna",
+    "sicilia": "Sicilia",
+    "toscana": "Toscana",
+    "trentino-alto-adige": "Trentino-Alto Adige/Südtirol",
+    "umbria": "Umbria",
+    "valle-d-aosta": "Valle d'Aosta/Vallée d'Aoste",
+    "veneto": "Veneto"
+}
 
 class NominatimFetcher:
     """
@@ -11,40 +57,22 @@ class NominatimFetcher:
     filtrandole opzionalmente per popolazione minima e utilizzando un sistema
     di cache per ridurre il numero di richieste alle API esterne.
     """
-    def __init__(self, user_agent="ItalianRegionsTSP/1.0"):
+    def __init__(self, user_agent="ItalianRegionsTSP/1.0", session=None):
         """
         Inizializza il fetcher con un User-Agent specifico.
 
         Args:
             user_agent (str): Lo User-Agent da utilizzare per le richieste HTTP.
                               È importante per rispettare le policy di OSM.
+            session (requests.Session, optional): Sessione HTTP da riutilizzare. Se None,
+                                                  ne viene creata una con connessioni persistenti
+                                                  e nuovi tentativi automatici. Default a None.
         """
         self.user_agent = user_agent
+        self.session = session if session is not None else self._create_session()
         self.base_url = "https://nominatim.openstreetmap.org/search" # URL base per Nominatim (non usato direttamente per le città qui)
 
-        # Mappatura dei codici regione ai nomi completi delle regioni italiane
-        self.regions = {
-            "abruzzo": "Abruzzo",
-            "basilicata": "Basilicata",
-            "calabria": "Calabria",
-            "campania": "Campania",
-            "emilia-romagna": "Emilia-Romagna",
-            "friuli-venezia-giulia": "Friuli-Venezia Giulia",
-            "lazio": "Lazio",
-            "liguria": "Liguria",
-            "lombardia": "Lombardia",
-            "marche": "Marche",
-            "molise": "Molise",
-            "piemonte": "Piemonte",
-            "puglia": "Puglia",
-            "sardegna": "Sardegna",
-            "sicilia": "Sicilia",
-            "toscana": "Toscana",
-            "trentino-alto-adige": "Trentino-Alto Adige/Südtirol",
-            "umbria": "Umbria",
-            "valle-d-aosta": "Valle d'Aosta/Vallée d'Aoste",
-            "veneto": "Veneto"
-        }
+        self.regions = REGIONS # Codici regione validi (vedi `REGIONS`)
 
     def fetch_cities(self, region: str, refresh=False, min_population=0):
         """
@@ -77,8 +105,8 @@ class NominatimFetcher:
         # Utilizza i dati dalla cache se il file esiste e non è richiesto un aggiornamento
         if not refresh and os.path.exists(data_file):
             print(f"Caricamento città per '{region_name_display}' dalla cache...")
-            with open(data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(data_file, 'rb') as f:
+                return orjson.loads(f.read()) # orjson decodifica direttamente i bytes, più rapidamente di json
 
         print(f"Recupero delle città per la regione '{region_name_display}' da Overpass API (pop. min: {min_population})...")
         cities = self._fetch_from_overpass(region_name_display, min_population)
@@ -93,6 +121,65 @@ class NominatimFetcher:
 
         return cities
 
+    def fetch_cities_arrays(self, region: str, refresh=False, min_population=0):
+        """
+        Recupera le città di una regione come array NumPy paralleli.
+
+        Accanto alla cache JSON viene mantenuto un file `.npz` con gli stessi dati:
+        se presente viene letto direttamente, senza decodificare il JSON né scorrere
+        una lista di dizionari. Le cache create in precedenza (solo JSON) vengono
+        convertite alla prima lettura.
+
+        Args:
+            region (str): Il codice della regione italiana (es. "lombardia").
+            refresh (bool, optional): Se True, forza il recupero dei dati dall'API. Default a False.
+            min_population (int, optional): La popolazione minima delle città incluse. Default a 0.
+
+        Returns:
+            dict: Un dizionario {'name', 'lat', 'lon', 'population'} di numpy.ndarray
+                  (array vuoti se non è stata trovata alcuna città).
+
+        Raises:
+            ValueError: Se il codice della regione fornito non è valido.
+            requests.exceptions.RequestException: Se si verifica un errore durante
+                                                  la richiesta all'API Overpass.
+        """
+        region_code = region.lower()
+        arrays_file = f"data/{region_code}_cities.npz"
+        if not refresh and region_code in self.regions and os.path.exists(arrays_file):
+            print(f"Caricamento città per '{self.regions[region_code]}' dalla cache...")
+            with np.load(arrays_file) as npz:
+                return {key: npz[key] for key in ('name', 'lat', 'lon', 'population')}
+
+        cities = self.fetch_cities(region, refresh=refresh, min_population=min_population)
+        city_arrays = cities_to_arrays(cities)
+        if cities and not os.path.exists(arrays_file): # Cache JSON creata prima dell'introduzione del file .npz
+            np.savez(arrays_file, **city_arrays)
+        return city_arrays
+
+    def _create_session(self):
+        """
+        Crea una sessione HTTP condivisa dalle richieste del fetcher.
+
+        La sessione mantiene aperte le connessioni (evitando un nuovo handshake TCP/TLS
+        a ogni richiesta) e ripete automaticamente le richieste fallite per errori
+        temporanei del server o per limiti di frequenza (429), con attesa crescente.
+        Le letture scadute (timeout) non vengono ripetute: con il timeout di 60 s della
+        query Overpass ogni nuovo tentativo potrebbe bloccare per un altro minuto.
+
+        Returns:
+            requests.Session: La sessione configurata.
+        """
+        session = requests.Session()
+        retry = Retry(total=3, read=0, backoff_factor=1.0, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset({"GET", "POST"})) # La query Overpass in POST è idempotente
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # Risposte compresse: il JSON di Overpass è testo molto ripetitivo e si comprime bene
+        session.headers.update({"User-Agent": self.user_agent, "Accept-Encoding": "gzip, deflate"})
+        return session
+
     def _fetch_from_overpass(self, region_name, min_population):
         """
         Esegue la query effettiva all'API Overpass per recuperare i dati delle città.
@@ -117,38 +204,43 @@ class NominatimFetcher:
         # Nota: la query Overpass non supporta direttamente il filtraggio per 'population' nel server-side in questo modo.
         # Il filtraggio per popolazione viene fatto client-side dopo aver ricevuto i dati.
 
-        response = requests.post(overpass_url, data={"data": query},
-                               headers={"User-Agent": self.user_agent})
+        # Lo User-Agent è passato a ogni richiesta: una sessione fornita dall'esterno ha quello
+        # predefinito di `requests`, non ammesso dalle policy di OSM. Il timeout lato client (60 s)
+        # lascia margine ai 30 s concessi alla query dal server
+        response = self.session.post(overpass_url, data={"data": query},
+                                     headers={"User-Agent": self.user_agent}, timeout=60)
         response.raise_for_status() # Solleva un'eccezione per errori HTTP (4xx o 5xx)
-        data = response.json()
+        data = orjson.loads(response.content)
 
-        cities_found = []
-        seen_city_names = set() # Per evitare duplicati basati sul nome
+        cities_by_name = {} # Nome -> città: evita i duplicati senza un contenitore a parte, mantenendo l'ordine
 
-        for element in data.get("elements", []):
-            tags = element.get("tags", {})
+        for element in data.get("elements", ()):
+            tags = element.get("tags")
+            if not tags:
+                continue
             name = tags.get("name")
+            if not name or name in cities_by_name: # Controllato prima di convertire la popolazione
+                continue
             # Converte la popolazione in float, gestendo l'assenza del tag o valori non numerici
             try:
-                population_str = tags.get("population", "0")
-                population = float(population_str) if population_str else 0.0
+                population = float(tags.get("population") or 0)
             except ValueError:
                 population = 0.0 # Default a 0 se la conversione fallisce
 
-            if name and (name not in seen_city_names) and population >= min_population:
-                seen_city_names.add(name)
-                cities_found.append({
+            if population >= min_population:
+                cities_by_name[name] = {
                     "name": name,
                     "lat": float(element["lat"]),
                     "lon": float(element["lon"]),
                     "population": population
-                })
+                }
 
-        return cities_found
+        return list(cities_by_name.values())
 
     def _save_to_cache(self, data_file_path, cities_data):
         """
-        Salva i dati delle città in un file JSON di cache.
+        Salva i dati delle città in un file JSON di cache, e gli stessi dati come
+        array paralleli in un file `.npz` accanto (letto da `fetch_cities_arrays`).
 
         Args:
             data_file_path (str): Il percorso completo del file di cache.
@@ -157,5 +249,7 @@ class NominatimFetcher:
         # Assicura che la directory 'data' esista
         os.makedirs(os.path.dirname(data_file_path), exist_ok=True)
 
-        with open(data_file_path, 'w', encoding='utf-8') as f:
-            json.dump(cities_data, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+        # Stesso formato leggibile di prima (indentazione di 2 spazi, caratteri UTF-8 non escapati)
+        with open(data_file_path, 'wb') as f:
+            f.write(orjson.dumps(cities_data, option=orjson.OPT_INDENT_2))
+        np.savez(os.path.splitext(data_file_path)[0] + '.npz', **cities_to_arrays(cities_data))
\ No newline at end of file
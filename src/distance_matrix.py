@@ -1,5 +1,53 @@
 import numpy as np
-from math import radians, sin, cos, sqrt, atan2
+from numba import njit, prange
+
+# Oltre questo numero di città la matrice viene calcolata da un kernel Numba che
+# scrive direttamente nel tipo richiesto, senza matrici N x N temporanee in float64
+LARGE_N_THRESHOLD = 500
+
+@njit(cache=True, fastmath=True, nogil=True, inline='always')
+def _haversine_row(lat, lon, cos_lat, i, out):
+    """
+    Calcola le distanze di Haversine tra la città `i` e le città successive,
+    scrivendole sia nella riga sia nella colonna `i` di `out` (matrice simmetrica).
+    """
+    out[i, i] = 0.0
+    for j in range(i + 1, lat.shape[0]):
+        sin_dlat = np.sin((lat[j] - lat[i]) * 0.5)
+        sin_dlon = np.sin((lon[j] - lon[i]) * 0.5)
+        a = sin_dlat * sin_dlat + cos_lat[i] * cos_lat[j] * sin_dlon * sin_dlon
+        d = 2.0 * 6371.0 * np.arcsin(np.sqrt(min(a, 1.0))) # Raggio medio della Terra: 6371 km
+        out[i, j] = d
+        out[j, i] = d
+
+@njit(cache=True, fastmath=True, nogil=True)
+def _haversine_matrix(lat, lon, out):
+    """
+    Riempie `out` con le distanze di Haversine tra tutte le coppie di città.
+
+    Ogni coppia è calcolata una sola volta (triangolo superiore) e copiata
+    nella posizione simmetrica.
+
+    Args:
+        lat (numpy.ndarray): Latitudini in radianti.
+        lon (numpy.ndarray): Longitudini in radianti.
+        out (numpy.ndarray): Matrice N x N di destinazione (float32 o float64).
+    """
+    cos_lat = np.cos(lat)
+    for i in range(lat.shape[0]):
+        _haversine_row(lat, lon, cos_lat, i, out)
+
+@njit(cache=True, fastmath=True, nogil=True, parallel=True)
+def _haversine_matrix_parallel(lat, lon, out):
+    """
+    Come `_haversine_matrix`, ma distribuisce le righe sui thread di Numba.
+
+    Da usare solo da processi a thread singolo (es. la CLI): con il threading layer
+    'workqueue' Numba non supporta kernel paralleli avviati da più thread contemporaneamente.
+    """
+    cos_lat = np.cos(lat)
+    for i in prange(lat.shape[0]):
+        _haversine_row(lat, lon, cos_lat, i, out)
 
 class DistanceCalculator:
     """
@@ -21,69 +69,83 @@ class DistanceCalculator:
         self.city_names = [city['name'] for city in cities]
         self.n_cities = len(cities)
 
-    def _haversine_distance(self, lat1, lon1, lat2, lon2):
+        # Latitudini e longitudini estratte una sola volta in array contigui (in radianti)
+        self.lat = np.radians(np.fromiter((city['lat'] for city in cities), dtype=np.float64, count=self.n_cities))
+        self.lon = np.radians(np.fromiter((city['lon'] for city in cities), dtype=np.float64, count=self.n_cities))
+        self._distance_matrix = None # Ultima matrice calcolata, riusata dalle chiamate successive
+
+    @classmethod
+    def from_arrays(cls, names, lat, lon):
         """
-        Calcola la distanza in linea d'aria tra due punti geografici
-        specificati da latitudine e longitudine, utilizzando la formula di Haversine.
+        Crea il calcolatore direttamente da array paralleli di nomi e coordinate,
+        senza costruire né scorrere una lista di dizionari.
 
         Args:
-            lat1 (float): Latitudine del primo punto in gradi.
-            lon1 (float): Longitudine del primo punto in gradi.
-            lat2 (float): Latitudine del secondo punto in gradi.
-            lon2 (float): Longitudine del secondo punto in gradi.
+            names (numpy.ndarray): Nomi delle città.
+            lat (numpy.ndarray): Latitudini in gradi.
+            lon (numpy.ndarray): Longitudini in gradi.
 
         Returns:
-            float: La distanza tra i due punti in chilometri.
+            DistanceCalculator: Il calcolatore (con `cities` pari a None).
         """
-        # Raggio medio della Terra in chilometri
-        R = 6371.0
-
-        # Converte le coordinate da gradi decimali a radianti
-        lat1_rad, lon1_rad = radians(lat1), radians(lon1)
-        lat2_rad, lon2_rad = radians(lat2), radians(lon2)
-
-        # Differenze di latitudine e longitudine
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
-
-        # Formula di Haversine
-        a = sin(dlat / 2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlon / 2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-
-        distance = R * c  # Distanza in chilometri
-        return distance
-
-    def calculate_distance_matrix(self):
+        calculator = cls.__new__(cls)
+        calculator.cities = None
+        calculator.city_names = list(names)
+        calculator.n_cities = len(calculator.city_names)
+        calculator.lat = np.radians(np.asarray(lat, dtype=np.float64))
+        calculator.lon = np.radians(np.asarray(lon, dtype=np.float64))
+        calculator._distance_matrix = None
+        return calculator
+
+    def calculate_distance_matrix(self, dtype=np.float32, parallel=False):
         """
         Calcola e restituisce una matrice N x N delle distanze tra tutte le coppie di città,
         dove N è il numero di città.
 
         La matrice è simmetrica (distanza[i, j] == distanza[j, i]) e la diagonale
-        principale è zero (distanza[i, i] == 0).
+        principale è zero (distanza[i, i] == 0). Viene calcolata una sola volta: le chiamate
+        successive con lo stesso `dtype` restituiscono la stessa matrice (da non modificare).
+
+        Args:
+            dtype (numpy.dtype, optional): Tipo degli elementi della matrice restituita. Default a
+                                           np.float32, il tipo usato da TSPSolver: la precisione è
+                                           ampiamente sufficiente per distanze in km e la matrice
+                                           occupa metà della memoria rispetto a np.float64.
+            parallel (bool, optional): Se True, per molte città il calcolo usa tutti i thread
+                                       di Numba (vedi `numba.set_num_threads`). Default a False.
 
         Returns:
             numpy.ndarray: Una matrice NumPy 2D contenente le distanze
                            tra ogni coppia di città in chilometri.
         """
-        # Inizializza una matrice N x N con zeri
-        distance_matrix = np.zeros((self.n_cities, self.n_cities))
-
-        # Popola la matrice calcolando la distanza tra ogni coppia di città
-        for i in range(self.n_cities):
-            for j in range(i + 1, self.n_cities): # Calcola solo per la parte superiore della matrice
-                city1 = self.cities[i]
-                city2 = self.cities[j]
-
-                dist = self._haversine_distance(
-                    city1['lat'], city1['lon'],
-                    city2['lat'], city2['lon']
-                )
-
-                # La matrice è simmetrica
-                distance_matrix[i, j] = dist
-                distance_matrix[j, i] = dist
-
-        return distance_matrix
+        if self._distance_matrix is not None and self._distance_matrix.dtype == dtype:
+            return self._distance_matrix
+
+        lat, lon = self.lat, self.lon
+
+        # Per molte città il calcolo vettoriale richiederebbe diverse matrici temporanee
+        # N x N in float64: il kernel compilato scrive invece direttamente nel risultato
+        if self.n_cities > LARGE_N_THRESHOLD:
+            distance_matrix = np.empty((self.n_cities, self.n_cities), dtype=dtype)
+            kernel = _haversine_matrix_parallel if parallel else _haversine_matrix
+            kernel(lat, lon, distance_matrix)
+            self._distance_matrix = distance_matrix
+            return distance_matrix
+
+        # Differenze tra tutte le coppie di città tramite broadcasting (matrici N x N)
+        dlat = lat[:, None] - lat[None, :]
+        dlon = lon[:, None] - lon[None, :]
+
+        # Formula di Haversine applicata in un'unica espressione vettoriale
+        # (il coseno delle latitudini è calcolato una sola volta sugli N valori)
+        cos_lat = np.cos(lat)
+        a = np.sin(dlat * 0.5)**2 + cos_lat[:, None] * cos_lat[None, :] * np.sin(dlon * 0.5)**2
+        np.minimum(a, 1.0, out=a) # Evita NaN da errori di arrotondamento (a appena sopra 1)
+        distance_matrix = 2 * 6371.0 * np.arcsin(np.sqrt(a)) # Raggio medio della Terra: 6371 km
+        np.fill_diagonal(distance_matrix, 0.0)
+
+        self._distance_matrix = distance_matrix.astype(dtype, copy=False)
+        return self._distance_matrix
 
     def get_closest_cities(self, city_index, n=5):
         """
@@ -102,26 +164,14 @@ class DistanceCalculator:
         if not (0 <= city_index < self.n_cities):
             raise IndexError("Indice della città non valido.")
 
-        # Calcola la matrice delle distanze se non già fatto (o se si vuole ricalcolarla)
-        # In un'applicazione reale, si potrebbe volerla memorizzare nella classe.
-        distance_matrix = self.calculate_distance_matrix()
+        # La matrice viene calcolata solo alla prima chiamata, poi riusata
+        distances_from_city = self.calculate_distance_matrix()[city_index]
 
-        # Estrae le distanze dalla città di riferimento
-        distances_from_city = distance_matrix[city_index]
+        # Selezione parziale in O(N) delle n+1 città più vicine (inclusa la città stessa),
+        # poi ordinamento dei soli candidati invece dell'intera riga
+        k = min(n + 1, self.n_cities)
+        candidates = np.argpartition(distances_from_city, k - 1)[:k]
+        candidates = candidates[np.argsort(distances_from_city[candidates], kind='stable')]
 
-        # Ottiene gli indici delle città ordinati per distanza
         # Esclude la città stessa (che avrà distanza 0)
-        sorted_indices = np.argsort(distances_from_city)
-
-        closest_cities_info = []
-        for i in sorted_indices:
-            if i == city_index: # Salta la città stessa
-                continue
-            if len(closest_cities_info) < n:
-                closest_cities_info.append(
-                    (i, self.city_names[i], distances_from_city[i])
-                )
-            else:
-                break # Abbiamo trovato le n città più vicine
-
-        return closest_cities_info
\ No newline at end of file
+        return [(i, self.city_names[i], distances_from_city[i]) for i in candidates if i != city_index][:n]
\ No newline at end of file
@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Semplice cache in memoria con politica LRU (Least Recently Used), sicura tra thread.
+
+    Quando viene superato il numero massimo di elementi, viene scartato
+    quello utilizzato meno di recente.
+    """
+
+    def __init__(self, maxsize=64):
+        """
+        Inizializza la cache.
+
+        Args:
+            maxsize (int, optional): Numero massimo di elementi memorizzati. Default a 64.
+        """
+        self.maxsize = maxsize
+        self._data = OrderedDict() # {chiave: valore}, in ordine di utilizzo
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Restituisce il valore associato alla chiave, segnandolo come usato di recente.
+
+        Args:
+            key: La chiave da cercare (deve essere hashable).
+            default (optional): Valore restituito se la chiave non è presente. Default a None.
+
+        Returns:
+            Il valore memorizzato oppure `default`.
+        """
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        """
+        Memorizza un valore, scartando l'elemento meno recente se la cache è piena.
+
+        Args:
+            key: La chiave (deve essere hashable).
+            value: Il valore da memorizzare.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Svuota la cache."""
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,113 @@
+import os
+import gzip
+import tempfile
+import orjson
+
+from src.lru_cache import LRUCache
+
+class SessionStore:
+    """
+    Gestisce i dati di sessione dell'applicazione web.
+
+    Ogni sessione è persistita su disco come file JSON compresso con gzip
+    (`data/session_{id}.json.gz`) e mantenuta in una cache LRU in memoria, così le richieste successive della
+    stessa sessione (risoluzione, download) non devono rileggere e decodificare il file.
+    """
+
+    def __init__(self, data_dir='data', max_entries=64):
+        """
+        Inizializza lo store delle sessioni.
+
+        Args:
+            data_dir (str, optional): Directory in cui salvare i file di sessione. Default a 'data'.
+            max_entries (int, optional): Numero massimo di sessioni tenute in memoria. Default a 64.
+        """
+        self.data_dir = data_dir
+        self._cache = LRUCache(maxsize=max_entries) # Sessioni usate di recente, già decodificate
+
+    def _path(self, prefix, session_id):
+        """Restituisce il percorso del file su disco associato alla sessione."""
+        return os.path.join(self.data_dir, f'{prefix}_{session_id}.json')
+
+    def _read(self, prefix, session_id):
+        """Legge un file della sessione, dalla memoria se disponibile o altrimenti dal disco."""
+        data = self._cache.get((prefix, session_id))
+        if data is None:
+            path = self._path(prefix, session_id)
+            if os.path.exists(path + '.gz'):
+                with gzip.open(path + '.gz', 'rb') as f:
+                    data = orjson.loads(f.read())
+            else: # File salvati prima dell'introduzione della compressione
+                with open(path, 'rb') as f:
+                    data = orjson.loads(f.read())
+            self._cache.put((prefix, session_id), data)
+        return dict(data)
+
+    def _write(self, prefix, session_id, data):
+        """Scrive un file della sessione su disco e nella cache in memoria."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        # orjson produce direttamente bytes UTF-8 e serializza anche scalari e array NumPy;
+        # compresslevel=1 ottiene gran parte della riduzione di dimensione con un costo di CPU minimo.
+        # Il file viene scritto in un temporaneo della stessa directory e poi sostituito in modo atomico:
+        # una richiesta concorrente (altro thread o processo) non legge mai un gzip troncato
+        fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=1) as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY))
+            os.replace(tmp_path, self._path(prefix, session_id) + '.gz')
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._cache.put((prefix, session_id), data)
+
+    def get(self, session_id):
+        """
+        Recupera i dati di una sessione, dalla memoria se disponibili o altrimenti dal disco.
+
+        Args:
+            session_id (str): L'identificatore della sessione.
+
+        Returns:
+            dict: Una copia (superficiale) dei dati della sessione, modificabile dal chiamante.
+
+        Raises:
+            FileNotFoundError: Se la sessione non esiste.
+        """
+        return self._read('session', session_id)
+
+    def put(self, session_id, session_data):
+        """
+        Salva i dati di una sessione su disco e nella cache in memoria.
+
+        Args:
+            session_id (str): L'identificatore della sessione.
+            session_data (dict): I dati da salvare.
+        """
+        self._write('session', session_id, session_data)
+
+    def get_results(self, session_id):
+        """
+        Recupera i risultati dell'ultima risoluzione TSP della sessione.
+
+        Args:
+            session_id (str): L'identificatore della sessione.
+
+        Returns:
+            dict: Una copia (superficiale) dei risultati.
+
+        Raises:
+            FileNotFoundError: Se per la sessione non è ancora stato risolto il TSP.
+        """
+        return self._read('results', session_id)
+
+    def put_results(self, session_id, results):
+        """
+        Salva i risultati di una risoluzione TSP in un file separato (`data/results_{id}.json.gz`),
+        così il file principale della sessione non deve essere riscritto a ogni risoluzione.
+
+        Args:
+            session_id (str): L'identificatore della sessione.
+            results (dict): Percorso, distanza, tempi e tratte calcolati.
+        """
+        self._write('results', session_id, results)
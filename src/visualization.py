@@ -1,19 +1,41 @@
-import matplotlib.pyplot as plt
-import networkx as nx
+# Matplotlib viene importato solo dentro i metodi che disegnano: importare questo
+# modulo (es. dalla CLI) non paga il costo di matplotlib finché non serve una mappa
 import numpy as np
-import argparse # Usato per ottenere opzionalmente il nome della regione
+import base64
+import io
 import os
 
+from src.lru_cache import LRUCache
+
+# Array estratti dalle liste di città, condivisi tra i visualizzatori creati sulla stessa lista
+# (es. per confrontare più percorsi). Chiave: (id(lista), len(lista)); ogni elemento tiene un
+# riferimento alla lista, così il suo id non può essere riusato finché resta in cache.
+# Gli array condivisi non vanno modificati.
+_CITY_ARRAYS_CACHE = LRUCache(maxsize=8)
+
+# Oltre questo numero di archi i numeri dei segmenti non vengono disegnati anche se richiesti:
+# sarebbero illeggibili (sovrapposti) e il loro rendering dominerebbe il tempo di disegno
+EDGE_LABEL_MAX_SEGMENTS = 30
+
+# Oltre questo numero di città i nomi non vengono disegnati: con troppe etichette la mappa
+# diventa illeggibile e il testo domina il tempo di rendering
+NODE_LABEL_MAX_CITIES = 100
+
+# Figure già disegnate mantenute in memoria per ogni visualizzatore (ognuna occupa qualche MB)
+RENDER_CACHE_SIZE = 4
+
 class TSPVisualizer:
     """
-    Visualizza il percorso TSP trovato su una mappa statica utilizzando Matplotlib e NetworkX.
+    Visualizza il percorso TSP trovato su una mappa statica utilizzando Matplotlib.
 
-    Questa classe si occupa di creare un grafo delle città, disegnare i nodi
-    (con dimensioni proporzionali alla popolazione), tracciare il percorso TSP
-    e opzionalmente salvare l'immagine o mostrarla a schermo.
+    Questa classe si occupa di disegnare le città (con dimensioni proporzionali
+    alla popolazione), tracciare il percorso TSP e opzionalmente salvare
+    l'immagine o mostrarla a schermo.
     """
 
-    def __init__(self, cities, path_indices=None):
+    _ensured_dirs = set() # Directory di output già create (o verificate) in questo processo
+
+    def __init__(self, cities, path_indices=None, region_name="N/A"):
         """
         Inizializza il visualizzatore.
 
@@ -22,164 +44,123 @@ class TSPVisualizer:
                            'name', 'lat', 'lon' e opzionalmente 'population'.
             path_indices (list, optional): Lista di indici di città che rappresenta il percorso TSP.
                                      Default a None.
+            region_name (str, optional): Nome della regione, usato nel titolo di default
+                                         e nel nome dei file HTML. Default a "N/A".
         """
         self.cities = cities
         self.path_indices = path_indices # Lista di indici del percorso
+        self._coords, self._pop, self._names = self._city_arrays(cities)
+        self._lon = self._coords[:, 0] # Viste sulle colonne di `_coords`
+        self._lat = self._coords[:, 1]
         self.fig = None # Figura Matplotlib
         self.ax = None  # Assi Matplotlib
-        self.region_name = self._get_region_name_from_args() # Nome della regione per il titolo
+        self.region_name = region_name # Nome della regione per il titolo
+        self._render_cache = LRUCache(maxsize=RENDER_CACHE_SIZE) # {chiave_dei_dati_disegnati: (figura, assi)}, vedi `_render_key`
+        self._embedded_images = {} # {chiave_dei_dati_disegnati: immagine PNG come data URI}
 
-    def _get_region_name_from_args(self):
-        """
-        Tenta di ottenere il nome della regione dagli argomenti della riga di comando.
-        Questo è un metodo di supporto per avere un titolo di default sensato se
-        l'informazione della regione non è passata esplicitamente.
-
-        Returns:
-            str: Il nome della regione o un valore di default.
-        """
-        # Questo è un modo per rendere il visualizzatore leggermente più consapevole
-        # del contesto CLI senza accoppiarlo strettamente.
-        # In un'applicazione web, questo nome verrebbe passato diversamente.
-        parser = argparse.ArgumentParser(add_help=False) # add_help=False per evitare conflitti se usato altrove
-        parser.add_argument('--region', type=str, default="N/A") # Default se non specificato
-        # parse_known_args ignora argomenti non riconosciuti, utile se TSPVisualizer è parte di uno script più grande
-        args, _ = parser.parse_known_args()
-        return args.region
-
-    def _create_graph_from_cities(self):
-        """
-        Crea un grafo NetworkX a partire dalla lista delle città.
-        I nodi rappresentano le città e gli archi (se `path_indices` è fornito)
-        rappresentano i segmenti del percorso TSP.
-
-        Returns:
-            networkx.Graph: Il grafo creato.
-        """
-        G = nx.Graph() # Grafo non orientato
-
-        # Aggiunge le città come nodi del grafo
-        for i, city_data in enumerate(self.cities):
-            G.add_node(i, # L'ID del nodo è l'indice della città nella lista originale
-                       pos=(city_data['lon'], city_data['lat']), # Posizione per il plotting (longitudine, latitudine)
-                       name=city_data['name'],
-                       population=city_data.get('population', 0)) # Popolazione, default a 0 se non presente
-
-        # Se un percorso è stato fornito, aggiunge gli archi che lo rappresentano
-        if self.path_indices and len(self.path_indices) > 1:
-            for i in range(len(self.path_indices) - 1):
-                u_node = self.path_indices[i]
-                v_node = self.path_indices[i+1]
-                G.add_edge(u_node, v_node)
-        return G
-
-    def _get_map_boundaries(self, node_positions):
+    def _get_map_boundaries(self):
         """
         Determina i limiti geografici (latitudine e longitudine min/max)
-        per la visualizzazione della mappa, basati sulle posizioni dei nodi.
-
-        Args:
-            node_positions (dict): Dizionario {node_id: (lon, lat)} delle posizioni dei nodi.
+        per la visualizzazione della mappa, basati sulle coordinate delle città.
 
         Returns:
             dict: Un dizionario con 'min_lon', 'max_lon', 'min_lat', 'max_lat'.
         """
-        if not node_positions:
-            # Valori di default se non ci sono nodi (caso improbabile ma gestito)
+        if self._lon.size == 0:
+            # Valori di default se non ci sono città (caso improbabile ma gestito)
             return {'min_lon': -10, 'max_lon': 10, 'min_lat': 35, 'max_lat': 50}
 
-        longitudes = [pos[0] for pos in node_positions.values()]
-        latitudes = [pos[1] for pos in node_positions.values()]
+        min_lon, max_lon = float(self._lon.min()), float(self._lon.max())
+        min_lat, max_lat = float(self._lat.min()), float(self._lat.max())
 
         # Aggiunge un margine per evitare che i nodi siano esattamente sui bordi
-        margin_lon = (max(longitudes) - min(longitudes)) * 0.10 # Margine del 10% della larghezza
-        margin_lat = (max(latitudes) - min(latitudes)) * 0.10 # Margine del 10% dell'altezza
-        
-        # Se i margini sono zero (es. una sola città), imposta un margine fisso
-        if margin_lon == 0: margin_lon = 0.1
-        if margin_lat == 0: margin_lat = 0.1
-
+        # (10% della larghezza/altezza; fisso se nullo, es. con una sola città)
+        margin_lon = (max_lon - min_lon) * 0.10 or 0.1
+        margin_lat = (max_lat - min_lat) * 0.10 or 0.1
 
         return {
-            'min_lon': min(longitudes) - margin_lon,
-            'max_lon': max(longitudes) + margin_lon,
-            'min_lat': min(latitudes) - margin_lat,
-            'max_lat': max(latitudes) + margin_lat
+            'min_lon': min_lon - margin_lon,
+            'max_lon': max_lon + margin_lon,
+            'min_lat': min_lat - margin_lat,
+            'max_lat': max_lat + margin_lat
         }
 
-    def _draw_city_nodes(self, graph, positions, ax):
+    def _draw_city_nodes(self, ax):
         """
-        Disegna i nodi (città) sul grafo.
-        La dimensione di ogni nodo è proporzionale alla sua popolazione.
+        Disegna i nodi (città) sulla mappa con un unico `scatter`.
+        La dimensione di ogni nodo è proporzionale alla sua popolazione; i nomi
+        sono disegnati solo fino a `NODE_LABEL_MAX_CITIES` città.
 
         Args:
-            graph (networkx.Graph): Il grafo contenente i nodi.
-            positions (dict): Dizionario delle posizioni dei nodi.
             ax (matplotlib.axes.Axes): Gli assi su cui disegnare.
 
         Returns:
             tuple: (popolazione_minima_usata, popolazione_massima_usata) per la legenda.
         """
-        populations = np.array([graph.nodes[node_id].get('population', 1000) for node_id in graph.nodes()])
-        # Evita divisione per zero se tutte le popolazioni sono uguali o se c'è solo una città
+        populations = self._pop
         min_pop = populations.min()
         max_pop = populations.max()
+        pop_span = max_pop - min_pop
 
-        if max_pop == min_pop: # Se tutte le popolazioni sono uguali (o c'è una sola città)
-            node_sizes_scaled = [100] * len(populations) # Usa una dimensione fissa
+        # Evita divisione per zero se tutte le popolazioni sono uguali o se c'è solo una città
+        if pop_span == 0:
+            node_sizes_scaled = np.full_like(populations, 100.0) # Usa una dimensione fissa
         else:
-            # Normalizza le dimensioni dei nodi in un range visibile (es. da 50 a 1500)
-            node_sizes_scaled = 50 + 1450 * (populations - min_pop) / (max_pop - min_pop)
+            # Normalizza le dimensioni dei nodi in un range visibile (da 50 a 1500)
+            node_sizes_scaled = 50.0 + 1450.0 * (populations - min_pop) / pop_span
 
-        nx.draw_networkx_nodes(graph, positions, ax=ax,
-                               node_size=node_sizes_scaled,
-                               node_color='skyblue',
-                               edgecolors='black', # Bordo dei nodi
-                               alpha=0.8)
+        ax.scatter(self._lon, self._lat, s=node_sizes_scaled,
+                   c='skyblue',
+                   edgecolors='black', # Bordo dei nodi
+                   alpha=0.8) # Sotto gli archi del percorso, che restano visibili fino alla punta delle frecce
+        # Mappa senza tacche né valori sugli assi
+        ax.tick_params(axis='both', which='both', bottom=False, left=False, labelbottom=False, labelleft=False)
 
         # Disegna le etichette (nomi delle città)
-        node_labels = {node_id: graph.nodes[node_id]['name'] for node_id in graph.nodes}
-        nx.draw_networkx_labels(graph, positions, ax=ax,
-                                labels=node_labels,
-                                font_size=8, # Dimensione font ridotta per leggibilità
-                                font_weight='bold')
+        if len(self._names) > NODE_LABEL_MAX_CITIES:
+            return min_pop, max_pop
+        for lon, lat, name in zip(self._lon, self._lat, self._names):
+            ax.text(lon, lat, name,
+                    fontsize=8, # Dimensione font ridotta per leggibilità
+                    fontweight='bold',
+                    ha='center', va='center')
         return min_pop, max_pop
 
-    def _draw_tsp_path(self, graph, positions, ax):
+    def _draw_tsp_path(self, ax, draw_labels=False):
         """
         Disegna gli archi che rappresentano il percorso TSP, se fornito.
-        Gli archi possono essere colorati o numerati per indicare la sequenza.
+        Su richiesta gli archi sono numerati per indicare la sequenza (solo fino a
+        `EDGE_LABEL_MAX_SEGMENTS` archi).
+
+        Tutti i segmenti formano un'unica `LineCollection` e le frecce di direzione
+        un unico `quiver`, invece di un oggetto Matplotlib (FancyArrowPatch) per arco.
 
         Args:
-            graph (networkx.Graph): Il grafo (dovrebbe contenere gli archi del percorso).
-            positions (dict): Dizionario delle posizioni dei nodi.
             ax (matplotlib.axes.Axes): Gli assi su cui disegnare.
+            draw_labels (bool, optional): Se True, numera i segmenti del percorso. Default a False.
         """
         if not self.path_indices or len(self.path_indices) < 2:
             return # Niente da disegnare se non c'è percorso
 
-        # Estrae gli archi dal percorso per disegnarli
-        path_edges = []
-        for i in range(len(self.path_indices) - 1):
-            path_edges.append((self.path_indices[i], self.path_indices[i+1]))
-
-        nx.draw_networkx_edges(graph, positions, ax=ax,
-                               edgelist=path_edges, # Disegna solo gli archi del percorso
-                               width=2.0,          # Spessore degli archi
-                               edge_color='green', # Colore degli archi del percorso
-                               arrows=True,        # Aggiunge frecce per indicare la direzione
-                               arrowstyle='-|>',
-                               arrowsize=15)
-
-        # Opzionale: etichette per numerare i segmenti del percorso
-        edge_labels_dict = {}
-        for i, edge in enumerate(path_edges):
-            edge_labels_dict[edge] = str(i + 1) # Numero progressivo del segmento
-
-        nx.draw_networkx_edge_labels(graph, positions, ax=ax,
-                                     edge_labels=edge_labels_dict,
-                                     font_size=7,
-                                     font_color='darkgreen')
+        from matplotlib.collections import LineCollection
+
+        # Segmenti del percorso come array (archi, 2, 2): per ogni arco i punti (lon, lat) di partenza e arrivo
+        coords = self._coords[np.asarray(self.path_indices)]
+        segments = np.stack((coords[:-1], coords[1:]), axis=1)
+
+        ax.add_collection(LineCollection(segments, linewidths=2.0, colors='green')) # Archi del percorso
+
+        # Frecce per indicare la direzione: una per arco, con la punta sulla città di arrivo
+        delta = segments[:, 1] - segments[:, 0]
+        ax.quiver(segments[:, 0, 0], segments[:, 0, 1], delta[:, 0], delta[:, 1],
+                  angles='xy', scale_units='xy', scale=1, width=0.003, color='green')
+
+        # Opzionale: etichette per numerare i segmenti del percorso, al centro di ogni arco
+        if not draw_labels or len(segments) > EDGE_LABEL_MAX_SEGMENTS:
+            return
+        midpoints = (coords[:-1] + coords[1:]) * 0.5
+        for i, (x, y) in enumerate(midpoints, 1):
+            ax.text(x, y, str(i), fontsize=7, color='darkgreen', ha='center', va='center', clip_on=True)
 
     def _add_map_legend(self, min_pop, max_pop, ax):
         """
@@ -191,49 +172,148 @@ class TSPVisualizer:
             max_pop (float): Popolazione massima usata per la scala dei nodi.
             ax (matplotlib.axes.Axes): Gli assi su cui aggiungere la legenda.
         """
-        # Crea degli handle fittizi per la legenda (scatter plot vuoti)
-        # Le dimensioni 's' qui sono indicative per la legenda.
+        from matplotlib.lines import Line2D
+
+        # Crea degli handle fittizi per la legenda (marcatori Line2D non aggiunti agli assi).
+        # Le dimensioni (area in punti², come la 's' di scatter) sono indicative per la legenda;
+        # markersize è il lato del marcatore, quindi la radice dell'area.
+        legend_entries = [(50, f'Pop. Min: ~{min_pop:,.0f}'), (200, 'Pop. Media'), (500, f'Pop. Max: ~{max_pop:,.0f}')]
         legend_handles = [
-            plt.scatter([], [], s=50, label=f'Pop. Min: ~{min_pop:,.0f}', color='skyblue', edgecolors='black'),
-            plt.scatter([], [], s=200, label='Pop. Media', color='skyblue', edgecolors='black'),
-            plt.scatter([], [], s=500, label=f'Pop. Max: ~{max_pop:,.0f}', color='skyblue', edgecolors='black')
+            Line2D([], [], marker='o', linestyle='', markersize=size ** 0.5, color='skyblue',
+                   markeredgecolor='black', label=label)
+            for size, label in legend_entries
         ]
         ax.legend(handles=legend_handles, title='Dimensione Città (Popolazione)', loc='best', fontsize='small')
 
 
-    def plot_path(self, title=None, save_path=None, figsize=(14, 10)): # Aumentata dimensione figura
+    @staticmethod
+    def _city_arrays(cities):
+        """
+        Estrae coordinate, popolazioni e nomi delle città in array (per il disegno vettoriale),
+        riusando quelli già calcolati per la stessa lista.
+
+        Args:
+            cities (list): Lista di dizionari città.
+
+        Returns:
+            tuple: (matrice contigua N x 2 di (lon, lat), array delle popolazioni, lista dei nomi).
+        """
+        key = (id(cities), len(cities))
+        cached = _CITY_ARRAYS_CACHE.get(key)
+        if cached is not None:
+            return cached[1:]
+
+        coords = np.fromiter(((city['lon'], city['lat']) for city in cities),
+                             dtype=np.dtype((np.float64, 2)), count=len(cities))
+        populations = np.fromiter((city.get('population', 0) for city in cities), dtype=np.float64, count=len(cities))
+        names = [city['name'] for city in cities]
+        _CITY_ARRAYS_CACHE.put(key, (cities, coords, populations, names))
+        return coords, populations, names
+
+    def _default_title(self):
+        """Restituisce il titolo di default della mappa (regione e numero di città)."""
+        title = f"Percorso TSP - Regione: {self.region_name.title()}"
+        if self.path_indices and self.cities:
+             title += f" ({len(self.path_indices)-1} città)"
+        return title
+
+    def _render_key(self, title, figsize, draw_edge_labels, headless):
+        """
+        Restituisce la chiave che identifica una figura già disegnata: due chiamate
+        con la stessa chiave produrrebbero la stessa immagine.
+
+        Args:
+            title (str): Titolo del grafico.
+            figsize (tuple): Dimensioni della figura Matplotlib.
+            draw_edge_labels (bool): Se i segmenti del percorso sono numerati.
+            headless (bool): Se la figura è creata senza interfaccia grafica.
+
+        Returns:
+            tuple: La chiave (hashable) per `_render_cache`.
+        """
+        return (len(self.cities), tuple(self.path_indices or ()), tuple(figsize), self.region_name, title, draw_edge_labels, headless)
+
+    def _save_figure(self, save_path, dpi):
+        """
+        Salva la figura corrente su file.
+
+        Args:
+            save_path (str): Percorso del file immagine.
+            dpi (int): Risoluzione dell'immagine in punti per pollice.
+        """
+        try:
+            # Assicura che la directory esista, una sola volta per directory e processo
+            directory = os.path.dirname(save_path) or '.'
+            if directory not in TSPVisualizer._ensured_dirs:
+                os.makedirs(directory, exist_ok=True)
+                TSPVisualizer._ensured_dirs.add(directory)
+            self.fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+            print(f"Visualizzazione salvata in: {save_path}")
+        except Exception as e:
+            print(f"Errore durante il salvataggio della visualizzazione in '{save_path}': {e}")
+
+    def plot_path(self, title=None, save_path=None, figsize=(14, 10), draw_edge_labels=False, headless=False, dpi=150): # Aumentata dimensione figura
         """
         Crea e visualizza (o salva) la mappa del percorso TSP.
 
+        La figura viene disegnata una sola volta per ogni combinazione di dati, titolo
+        e dimensioni: le chiamate successive riusano quella già creata (ed eventualmente
+        la salvano di nuovo).
+
         Args:
             title (str, optional): Titolo per il grafico. Se None, ne viene generato uno di default.
             save_path (str, optional): Percorso del file dove salvare l'immagine (es. "mappa.png").
                                        Se None, l'immagine non viene salvata.
             figsize (tuple, optional): Dimensioni della figura Matplotlib.
+            draw_edge_labels (bool, optional): Se True, numera i segmenti del percorso nell'ordine
+                                               di visita. Utile solo per percorsi piccoli (fino a
+                                               `EDGE_LABEL_MAX_SEGMENTS` archi): le etichette sono
+                                               gli elementi più costosi da disegnare. Default a False.
+            headless (bool, optional): Se True, la figura viene creata direttamente sul backend Agg
+                                       (senza pyplot né toolkit grafici): da usare quando l'immagine
+                                       va solo salvata, non mostrata con `show`. Default a False.
+            dpi (int, optional): Risoluzione dell'immagine salvata. Default a 150, sufficiente per
+                                 lo schermo; per la stampa si può passare un valore più alto (es. 300),
+                                 al costo di 4 volte i pixel da disegnare e comprimere.
 
         Returns:
             tuple: (matplotlib.figure.Figure, matplotlib.axes.Axes) La figura e gli assi creati.
         """
         if title is None:
-            title = f"Percorso TSP - Regione: {self.region_name.title()}"
-            if self.path_indices and self.cities:
-                 title += f" ({len(self.path_indices)-1} città)"
-
-
-        graph = self._create_graph_from_cities()
-        node_positions = nx.get_node_attributes(graph, 'pos') # {node_id: (lon, lat)}
-
-        self.fig, self.ax = plt.subplots(figsize=figsize)
+            title = self._default_title()
+
+        render_key = self._render_key(title, figsize, draw_edge_labels, headless)
+        cached = self._render_cache.get(render_key)
+        if cached is not None and not headless:
+            import matplotlib.pyplot as plt
+            if not plt.fignum_exists(cached[0].number):
+                cached = None # Figura già chiusa da pyplot (es. dopo `show`): va ridisegnata
+        if cached is not None:
+            self.fig, self.ax = cached
+            if save_path:
+                self._save_figure(save_path, dpi)
+            return self.fig, self.ax
+
+        if headless:
+            # Figura non registrata in pyplot: nessun backend interattivo da inizializzare
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+            self.fig = Figure(figsize=figsize, layout='constrained')
+            FigureCanvasAgg(self.fig)
+            self.ax = self.fig.subplots()
+        else:
+            import matplotlib.pyplot as plt
+            self.fig, self.ax = plt.subplots(figsize=figsize, layout='constrained')
 
-        map_bounds = self._get_map_boundaries(node_positions)
+        map_bounds = self._get_map_boundaries()
         self.ax.set_xlim(map_bounds['min_lon'], map_bounds['max_lon'])
         self.ax.set_ylim(map_bounds['min_lat'], map_bounds['max_lat'])
 
         # Disegna i nodi (città)
-        min_pop, max_pop = self._draw_city_nodes(graph, node_positions, self.ax)
+        min_pop, max_pop = self._draw_city_nodes(self.ax)
 
         # Disegna il percorso TSP
-        self._draw_tsp_path(graph, node_positions, self.ax)
+        self._draw_tsp_path(self.ax, draw_labels=draw_edge_labels)
 
         # Aggiunge la legenda per la dimensione dei nodi
         if min_pop is not None and max_pop is not None : # Solo se ci sono dati di popolazione
@@ -252,25 +332,23 @@ class TSPVisualizer:
             # ma generalmente questa informazione proviene dal solver.
             # total_distance_info = ...
             fig_text = f"Partenza: {start_city_name_info}. Città visitate: {num_visited_cities}."
-            self.fig.text(0.5, 0.01, fig_text, ha='center', fontsize=10, style='italic')
-
+            # Etichetta inferiore della figura: il layout "constrained" le riserva lo spazio
+            # (a differenza di un `fig.text` libero), senza un passaggio di tight_layout
+            self.fig.supxlabel(fig_text, fontsize=10, style='italic')
 
-        plt.tight_layout(rect=[0, 0.03, 1, 0.97]) # Aggiusta layout per fare spazio al titolo e figtext
+        self._render_cache.put(render_key, (self.fig, self.ax))
 
         if save_path:
-            try:
-                # Assicura che la directory esista
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                plt.savefig(save_path, dpi=300, bbox_inches='tight')
-                print(f"Visualizzazione salvata in: {save_path}")
-            except Exception as e:
-                print(f"Errore durante il salvataggio della visualizzazione in '{save_path}': {e}")
+            self._save_figure(save_path, dpi)
 
         return self.fig, self.ax
 
     def show(self):
         """Mostra la visualizzazione a schermo."""
-        if self.fig:
+        if self.fig and self.fig.canvas.manager is None: # Figura creata fuori da pyplot
+            print("La figura è stata creata con headless=True e può essere solo salvata. Chiamare plot_path(headless=False).")
+        elif self.fig:
+            import matplotlib.pyplot as plt
             plt.show()
         else:
             print("Nessuna figura da mostrare. Chiamare prima plot_path().")
@@ -280,7 +358,8 @@ class TSPVisualizer:
         Crea una visualizzazione HTML statica contenente l'immagine del percorso TSP.
         Questo è un metodo legacy se non si usa Folium.
         NOTA: Il progetto principale ora usa Folium per le mappe interattive nell'app web.
-              Questa funzione genera un PNG e lo embedda in HTML.
+              Questa funzione genera un PNG e lo incorpora nell'HTML come data URI (base64):
+              la pagina è un unico file, senza immagini esterne da distribuire insieme.
 
         Args:
             output_file (str, optional): Nome del file HTML di output.
@@ -289,15 +368,16 @@ class TSPVisualizer:
         if output_file is None:
             output_file = f"tsp_visualization_{self.region_name.lower().replace(' ', '_')}.html"
 
-        # Definisce il nome del file immagine basato sul nome del file HTML
-        image_file_name = os.path.splitext(output_file)[0] + ".png"
-        # Crea un percorso completo per l'immagine, ad esempio in una sottocartella 'static'
-        # Questo dipende da dove si vuole che l'HTML cerchi l'immagine.
-        # Per semplicità, assumiamo che l'immagine sia nella stessa directory dell'HTML o un percorso relativo.
-        image_path_for_html = os.path.basename(image_file_name) # Riferimento relativo per l'HTML
-
-        # Genera e salva l'immagine PNG
-        self.plot_path(save_path=image_file_name) # Salva l'immagine
+        # Genera l'immagine PNG in memoria, a meno che non sia già stata codificata per gli stessi dati
+        # (l'immagine va solo incorporata in una pagina: nessun backend interattivo, 100 dpi)
+        render_key = self._render_key(self._default_title(), (14, 10), False, True) # Valori di default di plot_path
+        image_uri = self._embedded_images.get(render_key)
+        if image_uri is None:
+            self.plot_path(headless=True)
+            buffer = io.BytesIO()
+            self.fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+            image_uri = 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+            self._embedded_images[render_key] = image_uri
 
         region_title_display = self.region_name.title()
         html_content = f"""
@@ -314,7 +394,7 @@ class TSPVisualizer:
         </head>
         <body>
             <h1>Visualizzazione del Percorso TSP per la Regione: {region_title_display}</h1>
-            <img src="{image_path_for_html}" alt="Mappa del Percorso TSP">
+            <img src="{image_uri}" alt="Mappa del Percorso TSP">
             <p>Questa mappa mostra il percorso ottimale calcolato tra le città selezionate.</p>
         </body>
         </html>
@@ -324,6 +404,5 @@ class TSPVisualizer:
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write(html_content)
             print(f"Visualizzazione HTML salvata in: {output_file}")
-            print(f"Assicurarsi che l'immagine '{image_path_for_html}' sia accessibile dall'HTML.")
         except Exception as e:
             print(f"Errore durante il salvataggio della visualizzazione HTML '{output_file}': {e}")
\ No newline at end of file